@@ -1,30 +1,46 @@
-import json
+import asyncio
 import logging
-from collections import deque 
+import threading
 
 from .orchestrator.state import return_initial_state
 from .orchestrator.graph import orchestrator_app
 from .formatter.grapy import create_plan_from_promotion_slots
+from app.core.config import settings
+from app.schema.stream import StreamEvent
+from app.utils.sse import ChunkCoalescer, with_deadline
+from app.utils.marker_scanner import MarkerScanner
 from app.mock.chat import *
 
 logger = logging.getLogger(__name__)
 
-async def stream_agent(chat_id, history, active_task, conn_str, schema_info, message):
-    state = return_initial_state(chat_id, history, active_task, conn_str, schema_info, message)
+TOKEN_START = "[TABLE_START]"
+TOKEN_END = "[TABLE_END]"
 
-    yield f"data: {json.dumps({'type': 'start'}, ensure_ascii=False)}\n\n"
+# 응답 텍스트에서 감지할 마커 -> SSE 이벤트 타입
+STREAM_MARKERS = {
+    TOKEN_START: "table_start",
+    TOKEN_END: "table_end",
+}
+_MARKER_TEXT = {name: token for token, name in STREAM_MARKERS.items()}
+
+def _chunk_event(text: str) -> StreamEvent:
+    return StreamEvent(type="chunk", content=text)
+
+async def stream_agent(chat_id, history, active_task, conn_str, schema_info, message, conversation_summary="", conversation_summary_until=None):
+    state = return_initial_state(chat_id, history, active_task, conn_str, schema_info, message, conversation_summary, conversation_summary_until)
+    # 클라이언트 연결이 끊기면 set 되어, 워커 스레드에서 실행 중인 툴 작업을 중단시킵니다.
+    cancel_event = threading.Event()
+
+    yield StreamEvent(type="start")
 
-    graph = None
     download_url = None 
     is_in_table = False 
-    
-    TOKEN_START = "[TABLE_START]"
-    TOKEN_END = "[TABLE_END]"
 
-    buffer_outside_table = deque(maxlen=len(TOKEN_START))
-    buffer_inside_table = deque(maxlen=len(TOKEN_END))
-
-    buffer = None 
+    scanner = MarkerScanner(STREAM_MARKERS)
+    coalescer = ChunkCoalescer(
+        max_chars=settings.STREAM_FLUSH_MAX_CHARS,
+        interval_ms=settings.STREAM_FLUSH_INTERVAL_MS,
+    )
     
     TOOL_NAME_MAP = {
         "t2s": "데이터베이스 조회 중...",
@@ -48,139 +64,139 @@ async def stream_agent(chat_id, history, active_task, conn_str, schema_info, mes
         "response_generator": "응답 생성 중...",
     }
 
+    # 같은 노드 안에서 반복되는 상태 메시지는 한 번만 보냅니다.
+    last_status = None
+
+    def status_events(contents):
+        nonlocal last_status
+        for content in contents:
+            if content == last_status:
+                continue
+            last_status = content
+            yield StreamEvent(type="state", content=content)
+
+    events = orchestrator_app.astream(
+        state,
+        config={"configurable": {"cancel_event": cancel_event}},
+        stream_mode=["custom", "messages", "updates"],
+    )
+    # 토큰이 뜸해도 모아둔 텍스트가 interval_ms 이상 묶여 있지 않도록 flush 기한까지만 기다립니다.
+    ticks = with_deadline(events, coalescer.timeout)
+
     try:
-        async for event in orchestrator_app.astream_events(state, version="v2"):
-            kind = event["event"]
-            current_node = event.get("metadata", {}).get("langgraph_node")
-            
-            # 프로모션 최종 생성 완료 시 plan 데이터 전송
-            if kind == "on_chain_end" and current_node == "response_generator":
-                final_state = event.get("data", {}).get("output")
-                if final_state and isinstance(final_state, dict) and final_state.get("is_final_promotion"):
+        # astream_events(v2)는 모든 하위 runnable의 입출력(state 전체)을 직렬화하므로,
+        # UI에 필요한 세 가지 스트림만 구독합니다.
+        #   - custom:   노드 시작/툴 시작 알림 (graph.py 의 get_stream_writer)
+        #   - messages: response_generator 토큰
+        #   - updates:  노드가 반환한 부분 상태 (visualizer/tool_executor/response_generator)
+        async for item in ticks:
+            if item is None:
+                if text := coalescer.flush():
+                    yield _chunk_event(text)
+                continue
+            mode, payload = item
+
+            # response_generator 가 끝났으면 마커 판정을 위해 보류했던 꼬리도 본문에 포함
+            if mode == "updates" and "response_generator" in payload:
+                for _, value in scanner.finish():
+                    coalescer.push(value.replace("\n", "\\n"))
+
+            # 텍스트 외 이벤트가 나가기 전에 모아둔 텍스트를 먼저 전송 (순서 보장)
+            if mode != "messages" and (text := coalescer.flush()):
+                yield _chunk_event(text)
+
+            if mode == "custom":
+                if payload.get("type") == "tool_start":
+                    # 각 툴 호출에 대해 구체적인 메시지를 전송합니다.
+                    for event in status_events(TOOL_NAME_MAP.get(t, t) for t in payload.get("tools", [])):
+                        yield event
+                elif payload.get("type") == "node_start" and payload.get("node") != "tool_executor":
+                    # tool_executor 는 구체적인 툴 메시지를 보내므로 제네릭한 노드 메시지는 건너뜁니다.
+                    node = payload.get("node")
+                    for event in status_events([NODE_NAME_MAP.get(node, node)]):
+                        yield event
+                continue
+
+            if mode == "messages":
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") != "response_generator":
+                    continue
+                if chunk and hasattr(chunk, "content") and chunk.content:
+                    for span_kind, value in scanner.feed(chunk.content):
+                        if span_kind == "marker":
+                            # 테이블 밖에서는 시작 마커만, 안에서는 종료 마커만 유효
+                            expected = "table_end" if is_in_table else "table_start"
+                            if value == expected:
+                                is_in_table = not is_in_table
+                                # 마커 앞의 텍스트가 마커 이벤트보다 먼저 나가도록 flush
+                                if text := coalescer.flush():
+                                    yield _chunk_event(text)
+                                yield StreamEvent(type=value)
+                                continue
+                            value = _MARKER_TEXT[value]
+
+                        if text := coalescer.push(value.replace("\n", "\\n")):
+                            yield _chunk_event(text)
+                continue
+
+            # mode == "updates": {노드명: 노드가 반환한 값}
+            for node, output in payload.items():
+                if not isinstance(output, dict):
+                    continue
+
+                # 프로모션 최종 생성 완료 시 plan 데이터 전송
+                if node == "response_generator" and output.get("is_final_promotion"):
                     # 프로모션 슬롯과 기획 내용 추출
-                    promotion_slots = final_state.get("promotion_slots", {})
-                    promotion_content = final_state.get("output", "")
-                    
-                    # formatter를 통해 plan 데이터 생성
+                    promotion_slots = output.get("promotion_slots") or {}
+                    promotion_content = output.get("output", "")
+
+                    # formatter를 통해 plan 데이터 생성 (실패 시에도 기본 plan 데이터 전송)
                     try:
                         create_plan_from_promotion_slots(promotion_slots, promotion_content)
-                        plan_payload = {
-                            "type": "plan",
-                            "content": promotion_slots.get('target_type', 'brand')
-                        }
-                        yield f"data: {json.dumps(plan_payload, ensure_ascii=False)}\n\n"
                     except Exception as e:
                         logging.error(f"Plan data generation failed: {e}")
-                        # 실패 시에도 기본 plan 데이터 전송
-                        plan_payload = {
-                            "type": "plan",
-                            "content": promotion_slots.get('target_type', 'brand')
-                        }
-                        yield f"data: {json.dumps(plan_payload, ensure_ascii=False)}\n\n"
-            
-            if kind == "on_chain_end" and current_node== "visualizer":
-                final_state = event.get("data", {}).get("output")
-                if final_state:
-                    viz_data = final_state.get("tool_results", {}).get("visualization")
+                    yield StreamEvent(type="plan", content=promotion_slots.get('target_type', 'brand'))
+
+                elif node == "visualizer":
+                    # 그래프는 준비되는 즉시 전송합니다. (응답 텍스트 생성을 기다리지 않음)
+                    viz_data = (output.get("tool_results") or {}).get("visualization")
                     if viz_data and viz_data.get("json_graph"):
-                        graph = {
-                            "type": "graph",
-                            "content": viz_data["json_graph"]
-                        }
-                        
-            if kind == "on_chain_end" and current_node == "tool_executor" and isinstance(event.get("data", {}).get("output"), dict):
-                final_state = event.get("data", {}).get("output")
-                if final_state:
-                    tool_results = final_state.get("tool_results", {})
+                        graph = StreamEvent(type="graph", content=viz_data["json_graph"])
+                        logger.info(f"===== 📈 그래프 생성됨 =====\n\n Graph data: \n {graph.content}")
+                        yield graph
+
+                elif node == "tool_executor" and download_url is None:
                     # t2s 결과를 찾습니다. 키가 t2s_0, t2s_1 등의 형태로 저장됨
-                    for key, value in tool_results.items():
+                    for key, value in (output.get("tool_results") or {}).items():
                         if key.startswith("t2s") and isinstance(value, dict) and "download_url" in value:
                             download_url = value.get("download_url")
-                            break  
-                                                 
-            if current_node == "tool_executor":
-                # 노드로 들어가는 입력(state)에서 tool_calls를 추출합니다.
-                input_state = event.get("data", {}).get("input", {})
-                instructions = input_state.get("instructions")
-                tool_calls = instructions.tool_calls if instructions else []
-                
-                if not tool_calls:
-                    continue # 실행할 툴이 없으면 넘어감
-
-                # 각 툴 호출에 대해 구체적인 메시지를 전송합니다.
-                for call in tool_calls:
-                    tool_name = call.get("tool", "알 수 없는 툴")
-                    display_name = TOOL_NAME_MAP.get(tool_name, tool_name)
-                    tool_payload = {
-                        "type": "state",
-                        "content": f"{display_name}"
-                    }
-                    yield f"data: {json.dumps(tool_payload, ensure_ascii=False)}\n\n"
-                
-                # 구체적인 툴 메시지를 보냈으므로, 제네릭한 노드 메시지는 건너뜁니다.
-                continue
-                
-            if kind=='on_chain_start':
-                if current_node not in ["__start__", "__end__"]:
-                    node_display_name = NODE_NAME_MAP.get(current_node, current_node)
-                    state_payload = {
-                        "type": "state",
-                        "content": f"{node_display_name}"
-                    }
-                    yield f"data: {json.dumps(state_payload, ensure_ascii=False)}\n\n"
-            
-            if kind == "on_chat_model_stream" and current_node== "response_generator":
-                chunk = event.get("data", {}).get("chunk")
-                if chunk and hasattr(chunk, "content") and chunk.content:
-                    for c in chunk.content:
-                        if c == "\n": c = "\\n"
-                        if is_in_table:
-                            buffer = buffer_inside_table
-                            token = TOKEN_END
-                            alert = "table_end"
-
-                        else: 
-                            buffer = buffer_outside_table
-                            token = TOKEN_START
-                            alert = "table_start"
-                        
-                        if len(buffer) < buffer.maxlen:
-                            buffer.append(c)
-                            continue 
-
-                        char = buffer.popleft()
-                        # 디버깅: 특수 문자 로깅
-                        if char in ['\n', '\r', '\t']:
-                            logger.info(f"특수 문자 전송: repr={repr(char)}")
-                        yield f"data: {json.dumps({'type': 'chunk', 'content': char}, ensure_ascii=False)}\n\n"
-                        buffer.append(c)
-
-                        window_text = "".join(buffer)
-                        if window_text == token:
-                            is_in_table = not is_in_table
-                            yield f"data: {json.dumps({'type': alert}, ensure_ascii=False)}\n\n"
-                            buffer.clear()
+                            break
+                    if download_url:
+                        logger.info(f"===== ✔︎ 다운로드 링크 생성됨 =====\n\n Download URL: \n {download_url}")
+                        yield StreamEvent(type="download", content=download_url)
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # 클라이언트 연결 종료: 그래프 실행과 진행 중인 툴 작업을 중단하고, 남은 이벤트는 보내지 않습니다.
+        logger.info(f"stream_agent cancelled (chat_id: {chat_id})")
+        cancel_event.set()
+        await ticks.aclose()
+        await events.aclose()
+        raise
 
     except Exception as e:
         # exc_info=True로 전체 스택 트레이스를 포함하여 로깅
         logger.error(f"Error in stream_agent: {e}", exc_info=True)
         
-        error_payload = {"type": "error", "message": "문제가 발생했습니다."}
-        yield f"data: {json.dumps(error_payload, ensure_ascii=False)}\n\n"
-
-    finally:
-        if buffer:
-            for c in buffer: 
-                yield f"data: {json.dumps({'type': 'chunk', 'content': c}, ensure_ascii=False)}\n\n"
-        if graph:
-            logger.info(f"===== 📈 그래프 생성됨 =====\n\n Graph data: \n {graph}")
-            yield f"data: {json.dumps(graph, ensure_ascii=False)}\n\n"
+        yield StreamEvent(type="error", message="문제가 발생했습니다.")
+
+    for _, value in scanner.finish():
+        coalescer.push(value.replace("\n", "\\n"))
+    if text := coalescer.flush():
+        yield _chunk_event(text)
+
+    # download 이벤트를 처리하지 않는 클라이언트와 저장된 대화 내용을 위해 본문 끝에도 링크를 붙입니다.
+    if download_url:
+        download_text = f"\n\n[CSV 다운로드 링크]({download_url})"
+        yield _chunk_event(download_text.replace("\n", "\\n"))
         
-        if download_url:
-            logger.info(f"===== ✔︎ 다운로드 링크 생성됨 =====\n\n Download URL: \n {download_url}")
-            download_text = f"\n\n[CSV 다운로드 링크]({download_url})"
-            for c in download_text:
-                if c == "\n": c = "\\n"
-                yield f"data: {json.dumps({'type': 'chunk', 'content': c}, ensure_ascii=False)}\n\n"
-            
-        yield f"data: {json.dumps({'type': 'done'}, ensure_ascii=False)}\n\n"
\ No newline at end of file
+    yield StreamEvent(type="done")
\ No newline at end of file
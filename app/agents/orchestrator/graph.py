@@ -1,22 +1,29 @@
 from __future__ import annotations
 
+import contextvars
 import json
 import textwrap
+import inspect
 import logging
+import threading
 from typing import List, Optional, Dict, Any, Literal, TypedDict, Union
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from datetime import timedelta, date, datetime
+from decimal import Decimal
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_anthropic import ChatAnthropic
 
 from app.core.config import settings
-from app.database.promotion_slots import update_state
+from app.database.promotion_slots import StateVersionConflict, update_state, update_state_with
 from app.agents.promotion.state import get_action_state
+from app.agents.progress import invoke_with_progress
 from app.agents.visualizer.graph import build_visualize_graph
 from app.agents.visualizer.state import VisualizeState
 from .state import *
@@ -25,6 +32,27 @@ from .helpers import *
 
 logger = logging.getLogger(__name__)
 
+class RunCancelled(Exception):
+    """클라이언트 연결 종료로 그래프 실행이 취소되었을 때 발생합니다."""
+
+def _cancel_event(config: Optional[RunnableConfig]) -> Optional[threading.Event]:
+    return ((config or {}).get("configurable") or {}).get("cancel_event")
+
+def _with_progress(node_name: str, node_fn):
+    """
+    노드 실행 직전에 custom 스트림으로 시작 알림을 보냅니다 (stream_agent 의 상태 메시지용).
+    이미 취소된 실행이면 노드를 시작하지 않습니다.
+    """
+    accepts_config = "config" in inspect.signature(node_fn).parameters
+
+    def wrapper(state: OrchestratorState, config: RunnableConfig):
+        cancel_event = _cancel_event(config)
+        if cancel_event is not None and cancel_event.is_set():
+            raise RunCancelled(f"'{node_name}' 노드 실행 전 취소됨")
+        get_stream_writer()({"type": "node_start", "node": node_name})
+        return node_fn(state, config) if accepts_config else node_fn(state)
+    return wrapper
+
 # ===== Nodes =====
 def _generate_llm_recommendations(state: OrchestratorState, rows: List[Dict[str, Any]], knowledge: Dict[str, Any]) -> List[Dict[str, Any]]:
     """LLM을 사용하여 DB 데이터와 지식 스냅샷을 기반으로 5개 추천 생성"""
@@ -236,6 +264,31 @@ def _merge_slots(state: OrchestratorState, updates: Dict[str, Any]) -> Promotion
         state["active_task"].slots = merged
     return merged
 
+# 한 번 채워지면 사용자 메시지로 덮어쓰지 않는 슬롯
+PRESERVED_SLOT_FIELDS = ("target_type", "focus", "duration", "selected_product", "wants_trend")
+
+def _drop_preserved_slots(updates: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """current 에 이미 값이 있는 보존 대상 필드를 updates 에서 제거한 사본을 반환합니다."""
+    kept = dict(updates)
+    preserved_fields = []
+    for field in PRESERVED_SLOT_FIELDS:
+        current_value = current.get(field)
+        if current_value not in (None, "", []) and field in kept:
+            preserved_fields.append(field)
+            logger.info("%s이(가) 이미 설정됨 (%s), 변경 방지", field, current_value)
+            del kept[field]
+
+    if preserved_fields:
+        logger.info("보존된 필드들: %s", preserved_fields)
+    return kept
+
+def _save_state(state: OrchestratorState, new_values: Dict[str, Any]):
+    """조건 없이 상태를 저장하고, 같은 턴의 이후 CAS 저장을 위해 반환된 버전을 state 에 반영합니다."""
+    saved = update_state(state["chat_id"], new_values)
+    if saved and state.get("active_task"):
+        state["active_task"].state_version = saved.get("version")
+    return saved
+
 def slot_extractor_node(state: OrchestratorState):
     logger.info("--- 🔍 슬롯 추출/저장 노드 실행 ---")
     user_message = state.get("user_message", "")
@@ -293,26 +346,33 @@ def slot_extractor_node(state: OrchestratorState):
     updates = {k: v for k, v in parsed.model_dump().items() if v not in (None, "", [])}
     
     # 이미 설정된 슬롯은 변경하지 않음 (기존 값 보존)
-    current_slots = state.get("active_task").slots if state.get("active_task") and state.get("active_task").slots else PromotionSlots()
-    
-    # 이미 채워진 필드들은 업데이트에서 제거
-    preserved_fields = []
-    for field in ["target_type", "focus", "duration", "selected_product", "wants_trend"]:
-        current_value = getattr(current_slots, field, None)
-        if current_value not in (None, "", []) and field in updates:
-            preserved_fields.append(field)
-            logger.info("%s이(가) 이미 설정됨 (%s), 변경 방지", field, current_value)
-            del updates[field]
-    
-    if preserved_fields:
-        logger.info("보존된 필드들: %s", preserved_fields)
+    active_task = state.get("active_task")
+    current_slots = active_task.slots if active_task and active_task.slots else PromotionSlots()
+    extracted = updates
+    updates = _drop_preserved_slots(extracted, current_slots.model_dump())
     
     if not updates:
         logger.info("슬롯 업데이트 없음")
         return {}
 
     try:
-        update_state(chat_id, updates)
+        # 턴 시작 시 읽은 버전 기준으로 저장 (1회 왕복). 그 사이 다른 턴이 상태를 바꿨으면
+        # 최신 상태를 다시 읽어 보존 규칙을 재적용합니다.
+        expected_version = active_task.state_version if active_task else None
+        try:
+            saved = update_state(chat_id, updates, expected_version=expected_version)
+        except StateVersionConflict:
+            applied: Dict[str, Any] = {}
+
+            def recompute(current: dict) -> dict:
+                applied.clear()
+                applied.update(_drop_preserved_slots(extracted, current))
+                return dict(applied)
+
+            saved = update_state_with(chat_id, recompute)
+            updates = applied
+        if saved and active_task:
+            active_task.state_version = saved.get("version")
         logger.info("Mongo 상태 업데이트: %s", updates)
     except Exception as e:
         logger.error("Mongo 업데이트 실패: %s", e)
@@ -409,7 +469,11 @@ def planner_node(state: OrchestratorState):
             return trend_planner_node(state)
 
         parser = PydanticOutputParser(pydantic_object=OrchestratorInstruction)
-        history_summary = summarize_history(state.get("history", []))
+        history_summary = summarize_history(
+            state.get("history", []),
+            summary=state.get("conversation_summary") or "",
+            summary_until=state.get("conversation_summary_until"),
+        )
         active_task_dump = state['active_task'].model_dump_json() if state.get('active_task') else 'null'
         schema_sig = state.get("schema_info", "")
         today = today_kr()
@@ -455,7 +519,7 @@ def planner_node(state: OrchestratorState):
     ## DB schema signature (hint only):
     {schema_sig}
 
-    ## Conversation summary (last turns):
+    ## Conversation summary (earlier turns + last turns):
     {history_summary}
 
     ## Active task snapshot (JSON or null):
@@ -637,7 +701,7 @@ def options_generator_node(state: OrchestratorState):
     logger.info("📝 생성된 T2S 인스트럭션: %s", t2s_instr[:200] + "..." if len(t2s_instr) > 200 else t2s_instr)
     
     logger.info("🚀 T2S 에이전트 실행 중...")
-    table = run_t2s_agent_with_instruction(state, t2s_instr, "visualize")  # 옵션 생성은 항상 시각화 포함
+    table = run_t2s_agent_with_instruction(state, t2s_instr, "visualize", progress=get_stream_writer())  # 옵션 생성은 항상 시각화 포함
     rows = table["rows"]
     
     logger.info("📊 T2S 결과 분석:")
@@ -650,7 +714,7 @@ def options_generator_node(state: OrchestratorState):
     if not rows:
         logger.warning("❌ T2S 후보 데이터가 비어 있습니다.")
         logger.info("🔄 빈 결과로 상태 업데이트 중...")
-        update_state(chat_id, {"product_options": []})
+        _save_state(state, {"product_options": []})
         tr = state.get("tool_results") or {}
         tr["option_candidates"] = {"candidates": [], "method": "deterministic_v1", "time_window": "", "constraints": {}}
         logger.info("✅ 빈 옵션 후보 반환 완료")
@@ -763,7 +827,7 @@ def options_generator_node(state: OrchestratorState):
 
     logger.info("💾 상태 업데이트 중...")
     try:
-        update_state(chat_id, {"product_options": labels})
+        _save_state(state, {"product_options": labels})
         logger.info("✅ 옵션 라벨 상태 저장 성공")
     except Exception as e:
         logger.error("❌ 옵션 라벨 저장 실패: %s", e)
@@ -809,7 +873,16 @@ def _parse_knowledge_calls(instr: Optional[Union[str, List[Dict[str, Any]], Dict
     return []
 
 
-def tool_executor_node(state: OrchestratorState):
+def _wait_or_cancel(futures: List[Future], cancel_event: Optional[threading.Event], poll_seconds: float = 0.2) -> bool:
+    """모든 future 가 끝날 때까지 기다립니다. 도중에 취소 요청이 오면 False 를 반환합니다."""
+    pending = set(futures)
+    while pending:
+        if cancel_event is not None and cancel_event.is_set():
+            return False
+        _, pending = wait(pending, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+    return True
+
+def tool_executor_node(state: OrchestratorState, config: RunnableConfig = None):
     logger.info("--- 🔨 툴 실행 노드 실행 ---")
     instructions = state.get("instructions")
     
@@ -829,8 +902,11 @@ def tool_executor_node(state: OrchestratorState):
         logger.info("instructions.tool_calls: %s", tool_calls)
         return {"tool_results": None}
 
+    writer = get_stream_writer()
+    writer({"type": "tool_start", "tools": [call.get("tool", "알 수 없는 툴") for call in tool_calls]})
+
     tool_map = {
-        "t2s": lambda args: run_t2s_agent_with_instruction(state, args.get("instruction", ""), args.get("output_type", "table")),
+        "t2s": lambda args: run_t2s_agent_with_instruction(state, args.get("instruction", ""), args.get("output_type", "table"), progress=writer),
         "tavily_search": lambda args: run_tavily_search(args.get("query", ""), args.get("max_results", 5)),
         "scrape_webpages": lambda args: scrape_webpages(args.get("urls", [])),
         "marketing_trend_search": lambda args: marketing_trend_search(args.get("question", "")),
@@ -839,7 +915,9 @@ def tool_executor_node(state: OrchestratorState):
     
     tool_results = {}
 
-    with ThreadPoolExecutor(max_workers=len(tool_calls)) as executor:
+    # with 블록은 종료 시 실행 중인 스레드를 모두 기다리므로, 취소 시 바로 빠져나올 수 있게 직접 관리합니다.
+    executor = ThreadPoolExecutor(max_workers=len(tool_calls))
+    try:
         future_to_call = {}
         for i, call in enumerate(tool_calls):
             tool_name = call.get("tool")
@@ -849,12 +927,19 @@ def tool_executor_node(state: OrchestratorState):
             
             if tool_name in tool_map:
                 result_key = f"{tool_name}_{i}"
-                future = executor.submit(tool_map[tool_name], tool_args)
+                # 노드의 컨텍스트를 복사해 실행해야 툴 스레드에서도 stream writer(하위 그래프 진행 알림)를 쓸 수 있습니다.
+                future = executor.submit(contextvars.copy_context().run, tool_map[tool_name], tool_args)
                 future_to_call[future] = result_key
                 logger.info(f"✅ {tool_name} 제출 완료 (result_key: {result_key})")
             else:
                 logger.warning(f"❌ 알 수 없는 도구 '{tool_name}' 호출은 건너뜁니다.")
                 logger.warning(f"사용 가능한 도구: {list(tool_map.keys())}")
+
+        if not _wait_or_cancel(list(future_to_call), _cancel_event(config)):
+            for future in future_to_call:
+                future.cancel()
+            logger.info("🛑 클라이언트 연결 종료로 툴 실행을 중단합니다.")
+            raise RunCancelled("툴 실행 중 취소됨")
         
         for future in future_to_call:
             result_key = future_to_call[future]
@@ -875,6 +960,8 @@ def tool_executor_node(state: OrchestratorState):
             except Exception as e:
                 logger.error(f"❌ '{result_key}' 툴 실행 중 오류 발생: {e}", exc_info=True)
                 tool_results[result_key] = {"error": str(e)}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
     logger.info(f"툴 실행 완료: {len(tool_results)}개 결과")
     existing_results = state.get("tool_results") or {}
@@ -911,6 +998,8 @@ def safe_json_dumps(obj, **kwargs):
     def date_handler(obj):
         if isinstance(obj, (date, datetime)):
             return obj.isoformat()
+        if isinstance(obj, Decimal):
+            return float(obj)
         raise TypeError(f'Object of type {type(obj)} is not JSON serializable')
     
     return json.dumps(obj, default=date_handler, **kwargs)
@@ -938,7 +1027,7 @@ def visualizer_caller_node(state: OrchestratorState):
         json_data=safe_json_dumps(t2s_result, ensure_ascii=False)
     )
     
-    viz_response = visualizer_app.invoke(viz_state)
+    viz_response = invoke_with_progress(visualizer_app, viz_state, get_stream_writer())
 
     # 시각화 결과를 tool_results에 추가
     if viz_response:
@@ -1216,13 +1305,13 @@ def response_generator_node(state: OrchestratorState):
 # ===== Graph =====
 workflow = StateGraph(OrchestratorState)
 
-workflow.add_node("planner", planner_node)
-workflow.add_node("slot_extractor", slot_extractor_node)
-workflow.add_node("action_state", action_state_node)
-workflow.add_node("options_generator", options_generator_node)
-workflow.add_node("tool_executor", tool_executor_node)
-workflow.add_node("visualizer", visualizer_caller_node) 
-workflow.add_node("response_generator", response_generator_node)
+workflow.add_node("planner", _with_progress("planner", planner_node))
+workflow.add_node("slot_extractor", _with_progress("slot_extractor", slot_extractor_node))
+workflow.add_node("action_state", _with_progress("action_state", action_state_node))
+workflow.add_node("options_generator", _with_progress("options_generator", options_generator_node))
+workflow.add_node("tool_executor", _with_progress("tool_executor", tool_executor_node))
+workflow.add_node("visualizer", _with_progress("visualizer", visualizer_caller_node))
+workflow.add_node("response_generator", _with_progress("response_generator", response_generator_node))
 
 workflow.set_entry_point("planner")
 
@@ -8,10 +8,22 @@ import math
 
 logger = logging.getLogger(__name__)
 
-def summarize_history(history: List[Dict[str, str]], limit_chars: int = 800) -> str:
-    """최근 히스토리를 간단 요약으로 제공 (LLM 컨텍스트용)"""
-    text = " ".join(h.get("content", "") for h in history[-6:])
-    return text[:limit_chars]
+def summarize_history(
+    history: List[Dict[str, Any]], limit_chars: int = 800, summary: str = "", summary_until: Optional[datetime] = None
+) -> str:
+    """
+    LLM 컨텍스트용 대화 요약. 채팅의 rolling 요약(summary)이 있으면 그 뒤에 최근 메시지를 붙입니다.
+    요약에 이미 반영된 메시지(timestamp <= summary_until)는 다시 보내지 않습니다.
+    대화가 길어져도 길이는 summary + limit_chars 로 일정합니다.
+    """
+    if summary and summary_until is not None:
+        history = [h for h in history if h.get("timestamp") is None or h["timestamp"] > summary_until]
+    text = " ".join(h.get("content", "") for h in history[-6:])[:limit_chars]
+    if not summary:
+        return text
+    if not text:
+        return summary
+    return f"{summary}\n\n[최근 대화]\n{text}"
 
 def today_kr() -> str:
     """Asia/Seoul 기준 오늘 날짜 yyyy-mm-dd"""
@@ -231,7 +243,10 @@ def ensure_table_payload(payload: Any) -> Dict[str, Any]:
                 rc = int(rc)
             except Exception:
                 rc = len(rows)
-        return {"rows": rows, "columns": cols, "row_count": rc}
+        table = {"rows": rows, "columns": cols, "row_count": rc}
+        if payload.get("row_count_exact") is False:
+            table["row_count_exact"] = False  # row_count 는 최소값 (큰 결과라 끝까지 세지 않음)
+        return table
     except Exception:
         return {"rows": [], "columns": [], "row_count": 0}
 
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Literal, TypedDict, List, Dict, Optional, Any, Union
 from pydantic import BaseModel, Field
 
@@ -26,6 +27,7 @@ class ActiveTask(BaseModel):
     task_id: str
     status: Literal["in_progress", "done"] # 쓸지는 모르겠지만 일단 두자
     slots: Optional[PromotionSlots] = Field(None, description="task_type이 promotion일 경우 진행 상황")
+    state_version: Optional[int] = Field(None, description="턴 시작 시 읽은 states 문서의 version (낙관적 동시성 제어)")
 
 class OrchestratorInstruction(BaseModel):
     tool_calls: Optional[List[Dict[str, Any]]] = Field(
@@ -42,6 +44,8 @@ class OrchestratorState(TypedDict):
     
     # --- 이전 Context --- 
     history: List[Dict[str, str]]
+    conversation_summary: str  # 채팅의 rolling 요약 (이전 턴 전체)
+    conversation_summary_until: Optional[datetime]  # 요약에 반영된 마지막 턴의 메시지 시각
     active_task: Optional[ActiveTask]
 
     # --- DB 관련 ---
@@ -54,12 +58,18 @@ class OrchestratorState(TypedDict):
     tool_results: Optional[Dict[str, Any]] = None
     output: str = ""
 
+    # --- 프로모션 최종 기획서 (response_generator 가 채움, 스트림 updates 로 전달) ---
+    promotion_slots: Optional[Dict[str, Any]] = None
+    is_final_promotion: bool = False
+
 # --- initial_state 생성 함수 --- 
-def return_initial_state(chat_id, history, active_task, conn_str, schema_info,message):
+def return_initial_state(chat_id, history, active_task, conn_str, schema_info,message, conversation_summary="", conversation_summary_until=None):
     
     return OrchestratorState(
         chat_id=chat_id,
         history=history,
+        conversation_summary=conversation_summary,
+        conversation_summary_until=conversation_summary_until,
         active_task=active_task,
         schema_info=schema_info,
         conn_str=conn_str,
@@ -1,14 +1,16 @@
 import logging 
 import json 
+import os
 
 from langchain_tavily import TavilySearch
 from langchain_community.document_loaders import WebBaseLoader
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 
-from app.database.supabase import supabase_client, embeddings
+from app.database.supabase import get_supabase_client, get_embeddings
 from app.core.config import settings 
-from app.utils.blob_storage import upload_dataframe_to_blob
+from app.core.resources import resources
+from app.utils.blob_storage import upload_file_to_blob
 
 from app.agents.text_to_sql.__init__ import call_sql_generator
 from .state import *
@@ -16,13 +18,19 @@ from .helpers import *
 
 logger = logging.getLogger(__name__)
 
-_tavily = TavilySearch(max_results=5)
+resources.register("tavily", factory=lambda: TavilySearch(max_results=5))
 
-def run_t2s_agent_with_instruction(state: OrchestratorState, instruction: str, output_type: str = "table"): 
+def get_tavily() -> Optional[TavilySearch]:
+    return resources.get("tavily")
+
+def run_t2s_agent_with_instruction(state: OrchestratorState, instruction: str, output_type: str = "table", generation_mode: Optional[str] = None, progress=None): 
     result = call_sql_generator(
         message=instruction, 
         conn_str=state["conn_str"], 
-        schema_info=state["schema_info"]
+        schema_info=state["schema_info"],
+        output_type=output_type,
+        generation_mode=generation_mode,
+        progress=progress,
     )
     table = result.get("data_json")
     if isinstance(table, str):
@@ -36,9 +44,12 @@ def run_t2s_agent_with_instruction(state: OrchestratorState, instruction: str, o
     table_with_output_type["output_type"] = output_type
     
     # export 타입일 경우 blob storage에 업로드
-    if output_type == "export" and result.get("dataframe") is not None:
+    if output_type == "export" and result.get("export_path"):
         logger.info("📤 Export 타입이므로 Blob Storage에 업로드합니다...")
-        download_url = upload_dataframe_to_blob(result["dataframe"])
+        try:
+            download_url = upload_file_to_blob(result["export_path"])
+        finally:
+            os.remove(result["export_path"])
         if download_url:
             table_with_output_type["download_url"] = download_url
             logger.info(f"✅ 파일 업로드 완료: {download_url[:100]}...")
@@ -54,7 +65,9 @@ def run_tavily_search(query: str, max_results: int = 5) -> Dict[str, Any]:
     { "results": [ {"title":..., "url":..., "content":...}, ... ] }
     """
     try:
-        tool = TavilySearch(max_results=max_results, ) if max_results != 5 else _tavily
+        tool = TavilySearch(max_results=max_results, ) if max_results != 5 else get_tavily()
+        if tool is None:
+            return {"results": [], "error": "tavily not configured"}
         out = tool.invoke(query) 
         if isinstance(out, str):
             try:
@@ -115,6 +128,7 @@ def marketing_trend_search(question: str) -> Dict[str, Any]:
     """
     logger.info("🔍 마케팅 트렌드 검색 시작 - 질문: %s", question)
     
+    supabase_client, embeddings = get_supabase_client(), get_embeddings()
     if not (supabase_client and embeddings):
         logger.error("❌ Supabase 클라이언트 또는 임베딩 미설정")
         return {"results": [], "error": "supabase_client/embeddings not configured"}
@@ -172,6 +186,7 @@ def beauty_youtuber_trend_search(question: str, summarize=True) -> Dict[str, Any
     Supabase 함수 'beauty_vector_search' 호출.
     스키마는 marketing_trend_search와 동일.
     """
+    supabase_client, embeddings = get_supabase_client(), get_embeddings()
     if not (supabase_client and embeddings):
         return {"results": [], "error": "supabase_client/embeddings not configured"}
     try:
@@ -0,0 +1,32 @@
+from typing import Any, Callable, Optional
+
+from langgraph.config import get_stream_writer
+
+StreamWriter = Callable[[Any], None]
+
+
+def with_node_progress(node_name: str, node_fn):
+    """
+    하위 그래프(text-to-SQL, visualizer) 노드 실행 직전에 custom 스트림으로 시작 알림을 보냅니다.
+    하위 그래프의 custom 이벤트는 상위 그래프 스트림에 자동으로 전달되지 않으므로, invoke_with_progress 로 실행해야 합니다.
+    """
+    def wrapper(state):
+        get_stream_writer()({"type": "node_start", "node": node_name})
+        return node_fn(state)
+    return wrapper
+
+
+def invoke_with_progress(app, state, writer: Optional[StreamWriter] = None):
+    """
+    컴파일된 하위 그래프를 실행하고 최종 상태를 반환합니다. (app.invoke 와 같은 결과)
+    실행 중 custom 이벤트(노드 시작 알림)는 상위 노드에서 get_stream_writer() 로 받은 writer 로 전달합니다.
+    writer 는 상위 노드의 컨텍스트에서 호출되어야 하므로, 툴 스레드에서는 contextvars.copy_context() 로 실행합니다.
+    """
+    result = None
+    for mode, payload in app.stream(state, stream_mode=["custom", "values"]):
+        if mode == "custom":
+            if writer is not None:
+                writer(payload)
+        else:
+            result = payload
+    return result
@@ -1,12 +1,20 @@
 import logging
+from app.agents.progress import invoke_with_progress
 from app.core.config import settings
 from .graph import t2s_app
 from .state import SQLState
 
 logger = logging.getLogger(__name__)
 
-def call_sql_generator(message, conn_str, schema_info):
-    state = SQLState(question=message, conn_str=conn_str, schema_info=schema_info)
-    response = t2s_app.invoke(state)
+def call_sql_generator(message, conn_str, schema_info, output_type="table", generation_mode=None, progress=None):
+    state = SQLState(
+        question=message,
+        conn_str=conn_str,
+        schema_info=schema_info,
+        output_type=output_type,
+        generation_mode=generation_mode or settings.SQL_GENERATION_MODE,
+    )
+    # progress: 노드 시작 알림을 받을 상위 그래프의 stream writer
+    response = invoke_with_progress(t2s_app, state, progress)
     
     return response
\ No newline at end of file
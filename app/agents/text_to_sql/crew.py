@@ -1,14 +1,20 @@
 import re 
+from functools import lru_cache
 from crewai import Agent, Crew, Task, Process, LLM
 from app.core.config import settings 
 
-def crewAI_sql_generator(message, schema_info, LLM_MODEL="gemini/gemini-2.5-flash"):
-    llm = LLM(
-        model=LLM_MODEL,
+@lru_cache(maxsize=4)
+def _crew_llm(model: str) -> LLM:
+    """LLM 클라이언트는 호출마다 새로 만들지 않고 모델별로 재사용합니다."""
+    return LLM(
+        model=model,
         temperature=0.0,
         api_key=settings.GOOGLE_API_KEY
     )
 
+def crewAI_sql_generator(message, schema_info, LLM_MODEL="gemini/gemini-2.5-flash"):
+    llm = _crew_llm(LLM_MODEL)
+
     query_parser = Agent(
         role="QueryParserAgent",
         goal="사용자의 자연어 질문을 SQL 분석 명세로 구조화한다: '{input}'",
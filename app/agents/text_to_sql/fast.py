@@ -0,0 +1,65 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_READ_ONLY_RE = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_WRITE_RE = re.compile(r"\b(insert|update|delete|merge|drop|alter|truncate|create|grant|revoke|copy)\b", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+class SQLGeneration(BaseModel):
+    sql: str = Field(description="실행할 PostgreSQL SELECT 쿼리 하나. 설명/마크다운 없이 SQL 만")
+
+
+@lru_cache(maxsize=4)
+def _fast_chain(schema_info: str, model: str):
+    """
+    스키마별 단일 호출 체인. 스키마를 앞쪽 system 메시지에 고정해 호출마다 같은 prefix 로 보내고,
+    LLM 클라이언트/프롬프트는 한 번만 만듭니다.
+    """
+    llm = ChatGoogleGenerativeAI(model=model, temperature=0, api_key=settings.GOOGLE_API_KEY, max_retries=2)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system",
+         "당신은 마케팅/커머스 데이터 분석용 PostgreSQL 쿼리를 작성하는 전문가입니다.\n"
+         "아래 스키마만 사용해 사용자 질문에 답하는 SELECT 쿼리 하나를 작성하세요.\n"
+         "- 질문의 대상(무엇을), 조건(누가, 언제, 어디서), 지표(얼마나)를 빠짐없이 반영하세요.\n"
+         "- 요청한 컬럼 이름과 개수(LIMIT)를 지키세요.\n"
+         "- 데이터 변경 문(INSERT/UPDATE/DELETE/DDL)은 작성하지 마세요.\n\n"
+         "--- 스키마 정보 ---\n{schema_info}"),
+        ("human", "{input}"),
+    ]).partial(schema_info=schema_info)
+    return prompt | llm.with_structured_output(SQLGeneration)
+
+
+def validate_sql(sql: str) -> Optional[str]:
+    """실행 전에 걸러낼 수 있는 문제를 확인합니다. 문제가 없으면 None, 있으면 이유를 반환합니다."""
+    body = _STRING_RE.sub("''", sql or "").strip().rstrip(";").strip()
+    if not body:
+        return "빈 SQL"
+    if not _READ_ONLY_RE.match(body):
+        return "SELECT/WITH 로 시작하지 않는 SQL"
+    if ";" in body:
+        return "여러 개의 SQL 문"
+    if _WRITE_RE.search(body):
+        return "데이터 변경 구문 포함"
+    if body.count("(") != body.count(")"):
+        return "괄호 짝이 맞지 않음"
+    return None
+
+
+def fast_sql_generator(message: str, schema_info: str, model: Optional[str] = None) -> str:
+    """LLM 한 번으로 SQL 을 생성합니다. 구조화 출력(SQLGeneration)을 사용하므로 코드 블록 파싱이 필요 없습니다."""
+    result = _fast_chain(schema_info, model or settings.SQL_FAST_MODEL).invoke({"input": message})
+    sql = result.sql.strip() if result is not None else ""
+    # 모델이 코드 블록으로 감싸 반환하는 경우 방어
+    match = re.search(r"```(?:sql)?\s*(.*?)```", sql, re.DOTALL)
+    return match.group(1).strip() if match else sql
@@ -1,87 +1,174 @@
-import pandas as pd 
+import csv
 import logging
-from sqlalchemy import text, create_engine
-from pandas.api.types import is_datetime64_any_dtype
+import math
+import os
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import text
 
 from langgraph.graph import StateGraph, END
 
+from app.agents.progress import with_node_progress
 from app.core.config import settings 
+from app.database.sql_engines import get_engine
 from .crew import crewAI_sql_generator
+from .fast import fast_sql_generator, validate_sql
+from .result_cache import get_cached_result, put_cached_result, result_cache_key
+from .sql_cache import get_cached_sql, invalidate_cached_sql, put_cached_sql
 from .state import *
 
 logger = logging.getLogger(__name__)
 MAX_ROWS = 20
 
 # --- Node --- 
-def call_t2s_crew(state: SQLState): 
-    message = state.question 
-    if state.error is not None: 
-        message += f"\n\n**주의점** 지난 번 생성한 SQL에서는 다음과 같은 에러가 발생했습니다: \n{state.error}\n 같은 실수를 반복하지 마세요."
-    sql = crewAI_sql_generator(message=message, schema_info=state.schema_info)
+def _try_fast_sql(state: SQLState):
+    try:
+        sql = fast_sql_generator(message=state.question, schema_info=state.schema_info)
+    except Exception as e:
+        logger.warning(f"fast SQL 생성 실패, crew 로 전환합니다: {e}")
+        return None
+
+    if problem := validate_sql(sql):
+        logger.warning(f"fast SQL 검증 실패({problem}), crew 로 전환합니다: {sql[:200]}")
+        return None
+    return sql
+
+def generate_sql(state: SQLState): 
+    # 재시도(이전 SQL 실패)가 아니면 같은 질문으로 생성해 성공한 SQL 을 재사용합니다.
+    if state.error is None and (cached := get_cached_sql(state.question, state.schema_info)):
+        sql, state.sql_cache_key = cached
+        state.query = text(sql)
+        state.generator = "cache"
+        return state
+
+    state.sql_cache_key = None
+
+    # fast 모드는 첫 시도에만 단일 LLM 호출로 생성합니다. 검증이나 실행에 실패하면 crew 파이프라인으로 넘어갑니다.
+    sql = _try_fast_sql(state) if state.generation_mode == "fast" and state.error is None else None
+    if sql is not None:
+        state.generator = "fast"
+    else:
+        message = state.question 
+        if state.error is not None: 
+            message += f"\n\n**주의점** 지난 번 생성한 SQL에서는 다음과 같은 에러가 발생했습니다: \n{state.error}\n 같은 실수를 반복하지 마세요."
+        sql = crewAI_sql_generator(message=message, schema_info=state.schema_info)
+        state.generator = "crew"
 
     state.query = text(sql)
     state.error = None
     
     return state 
 
-def call_sql(state: SQLState):
-    engine = None
-    try:
-        engine = create_engine(state.conn_str, pool_pre_ping=True)
+def _json_value(value):
+    """JSON/CSV 로 내보낼 값. NUMERIC(Decimal) 은 float, 날짜는 ISO 문자열, NaN 은 None 으로 바꿉니다."""
+    if isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%dT%H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _open_export_file():
+    spool_dir = settings.SQL_EXPORT_SPOOL_DIR or None
+    if spool_dir:
+        os.makedirs(spool_dir, exist_ok=True)
+    # UTF-8 BOM: 엑셀에서 한글이 깨지지 않도록
+    return tempfile.NamedTemporaryFile(
+        "w", suffix=".csv", prefix="export_", dir=spool_dir, delete=False, newline="", encoding="utf-8-sig"
+    )
 
-        # 실행
-        df = pd.read_sql_query(state.query, engine)
-
-        # 멀티컬럼 방어
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = ["__".join(map(str, c)).strip() for c in df.columns.values]
-
-        # 날짜 컬럼 ISO 문자열화
-        for col in df.columns:
-            try:
-                if is_datetime64_any_dtype(df[col]):
-                    df[col] = df[col].dt.strftime("%Y-%m-%dT%H:%M:%S")
-            except Exception:
-                pass
+def call_sql(state: SQLState):
+    """
+    SQL 을 server-side cursor 로 실행하고 결과를 청크 단위로 읽습니다.
+    결과 크기와 관계없이 메모리에는 미리보기(MAX_ROWS)와 현재 청크만 둡니다.
+    - export: 전체 결과를 임시 CSV 로 기록하고 경로를 state.export_path 에 남깁니다.
+    - 그 외: 행 수만 셉니다. SQL_COUNT_MAX_ROWS 를 넘으면 읽기를 멈추고 row_count_exact=False 로 표시합니다.
+    """
+    export_file = None
+    is_export = state.output_type == "export"
+
+    # export 는 전체 결과가 필요하므로 결과 캐시를 쓰지 않습니다.
+    # 키는 실행 전에 한 번만 만듭니다. (실행 중 무효화된 결과가 새 세대로 저장되지 않도록)
+    result_key = None if is_export else result_cache_key(state.conn_str, str(state.query))
+    if (cached := get_cached_result(result_key)) is not None:
+        state.data_json = cached
+        if state.sql_cache_key is None:
+            put_cached_sql(state.question, state.schema_info, str(state.query))
+        return state
 
-        # NaN/NaT -> None (JSON null)
-        df = df.where(pd.notnull(df), None)
+    try:
+        engine = get_engine(state.conn_str)
+        chunk_rows = settings.SQL_FETCH_CHUNK_ROWS
+
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(state.query)
+            columns = [str(c) for c in result.keys()]
+
+            if is_export:
+                export_file = _open_export_file()
+                writer = csv.writer(export_file)
+                writer.writerow(columns)
+
+            preview = []
+            row_count = 0
+            row_count_exact = True
+            while chunk := result.fetchmany(chunk_rows):
+                rows = [[_json_value(v) for v in row] for row in chunk]
+                row_count += len(rows)
+                if len(preview) < MAX_ROWS:
+                    preview.extend(dict(zip(columns, row)) for row in rows[:MAX_ROWS - len(preview)])
+                if is_export:
+                    writer.writerows(rows)
+                elif row_count >= settings.SQL_COUNT_MAX_ROWS:
+                    row_count_exact = False
+                    break
+            result.close()
+
+        if export_file is not None:
+            export_file.close()
+            state.export_path = export_file.name
 
         # 미리보기만 담고 전체 행수는 별도 기입
-        preview = df.head(MAX_ROWS)
-
         state.data_json = {
-            "rows": preview.to_dict(orient="records"),     # ✅ [{col:val}, ...]
-            "columns": [str(c) for c in preview.columns],  # ✅ 열 이름
-            "row_count": int(df.shape[0]),                 # ✅ 전체 행 수
+            "rows": preview,                    # ✅ [{col:val}, ...]
+            "columns": columns,                 # ✅ 열 이름
+            "row_count": row_count,             # ✅ 전체 행 수 (row_count_exact=False 면 최소값)
+            "row_count_exact": row_count_exact,
         }
-        
-        # DataFrame 객체도 저장 (export용)
-        state.dataframe = df
 
         logger.info(
-            "SQL 실행 성공 | row_count=%s, columns=%s",
-            state.data_json["row_count"],
-            state.data_json["columns"],
+            "SQL 실행 성공 | row_count=%s%s, columns=%s",
+            row_count,
+            "" if row_count_exact else "+",
+            columns,
         )
 
         logger.info(f"{state.query}")
+        put_cached_result(result_key, state.data_json)
+        if state.sql_cache_key is None:
+            put_cached_sql(state.question, state.schema_info, str(state.query))
 
     except Exception as e:
+        if state.sql_cache_key is not None:
+            invalidate_cached_sql(state.sql_cache_key)
+        if export_file is not None:
+            export_file.close()
+            try:
+                os.remove(export_file.name)
+            except OSError:
+                pass
         # 실패해도 data_json은 동일 스키마로 채워서 downstream이 깨지지 않게
         state.data_json = {"rows": [], "columns": [], "row_count": 0, "error": str(e)}
         state.error = str(e)  # Exception 객체를 문자열로 변환
-        state.tried = getattr(state, "tried", 0) + 1
+        # fast/캐시 SQL 의 실패는 crew 로 넘어가는 단계이므로 crew 의 재시도 횟수에 넣지 않습니다.
+        if state.generator not in ("fast", "cache"):
+            state.tried = getattr(state, "tried", 0) + 1
         logger.error(f"SQL 실행 실패:{e}")
 
-    finally:
-        # 커넥션 정리
-        try:
-            if engine is not None:
-                engine.dispose()
-        except Exception:
-            pass
-
     return state
     
 def check_table(state: SQLState): 
@@ -93,8 +180,8 @@ def check_table(state: SQLState):
 # --- Graph --- 
 workflow = StateGraph(SQLState)
 
-workflow.add_node('generate_sql', call_t2s_crew)
-workflow.add_node('make_table', call_sql)
+workflow.add_node('generate_sql', with_node_progress('generate_sql', generate_sql))
+workflow.add_node('make_table', with_node_progress('make_table', call_sql))
 
 workflow.set_entry_point("generate_sql")
 workflow.add_edge("generate_sql", "make_table")
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.utils.ttl_cache import InMemoryLRUBackend, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# (DB fingerprint, 정규화된 SQL, 파라미터, 전체 세대, 참조 테이블별 세대) -> data_json (미리보기 + row_count)
+sql_result_cache = TTLCache(
+    name="sql_result",
+    backend=InMemoryLRUBackend(max_size=settings.SQL_RESULT_CACHE_MAX_SIZE),
+    ttl_seconds=settings.SQL_RESULT_CACHE_TTL_SECONDS,
+)
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|\s+|[^'\"\s]+")
+_TABLE_RE = re.compile(r"\b(?:from|join)\s+((?:\"[^\"]+\"|[\w$]+)(?:\.(?:\"[^\"]+\"|[\w$]+))?)", re.IGNORECASE)
+_READ_ONLY_RE = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+
+# 테이블 -> 세대. invalidate_tables() 가 세대를 올리면 이전 세대로 만든 키는 더 이상 조회되지 않고 TTL/LRU 로 정리됩니다.
+_generations: Dict[str, int] = {}
+_epoch = 0  # 전체 무효화 세대
+_generation_lock = threading.Lock()
+
+ResultCacheKey = Tuple[Tuple, float]  # (캐시 키, TTL 초)
+
+
+def canonical_sql(sql: str) -> str:
+    """주석 제거, 공백 정리, 문자열 literal 밖의 대소문자 통일, 끝의 ; 제거."""
+    tokens = []
+    for token in _TOKEN_RE.findall(_COMMENT_RE.sub(" ", sql)):
+        if token.isspace():
+            tokens.append(" ")
+        elif token[0] in "'\"":
+            tokens.append(token)
+        else:
+            tokens.append(token.lower())
+    return "".join(tokens).strip().rstrip(";").strip()
+
+
+def referenced_tables(sql: str) -> Set[str]:
+    """FROM/JOIN 뒤의 테이블 이름 (스키마, 따옴표 제외). CTE 이름도 포함될 수 있습니다."""
+    return {match.split(".")[-1].strip('"').lower() for match in _TABLE_RE.findall(sql)}
+
+
+def _ttl_for(tables: Iterable[str]) -> float:
+    ttls = [settings.SQL_RESULT_CACHE_TABLE_TTLS.get(table, settings.SQL_RESULT_CACHE_TTL_SECONDS) for table in tables]
+    return min(ttls, default=settings.SQL_RESULT_CACHE_TTL_SECONDS)
+
+
+def result_cache_key(conn_str: str, sql: str, params: Optional[Dict[str, Any]] = None) -> Optional[ResultCacheKey]:
+    """
+    실행 전에 한 번 만들어 get/put 에 같이 넘깁니다.
+    키에 실행 시작 시점의 세대가 들어가므로, 실행 중에 invalidate_tables() 가 호출되면
+    무효화 이전 데이터로 만든 결과는 새 세대 키로 조회되지 않습니다.
+    SELECT/WITH 가 아니면 None 입니다.
+    """
+    if not settings.SQL_RESULT_CACHE_ENABLED:
+        return None
+    canonical = canonical_sql(sql)
+    if not _READ_ONLY_RE.match(canonical):
+        return None
+    tables = sorted(referenced_tables(canonical))
+    with _generation_lock:
+        generations = (_epoch, tuple((table, _generations.get(table, 0)) for table in tables))
+    key = (
+        hashlib.sha256(conn_str.encode("utf-8")).hexdigest()[:16],
+        canonical,
+        json.dumps(params or {}, sort_keys=True, default=str),
+        generations,
+    )
+    return key, _ttl_for(tables)
+
+
+def get_cached_result(cache_key: Optional[ResultCacheKey]) -> Optional[Dict[str, Any]]:
+    if cache_key is None:
+        return None
+    result = sql_result_cache.get(cache_key[0])
+    if result is not None:
+        logger.info("⚡ SQL 결과 캐시 hit | row_count=%s", result.get("row_count"))
+    return result
+
+
+def put_cached_result(cache_key: Optional[ResultCacheKey], data_json: Dict[str, Any]) -> None:
+    """성공한 조회의 data_json(미리보기 + row_count)만 저장합니다. cache_key 는 실행 전에 만든 키입니다."""
+    if cache_key is None or data_json.get("error"):
+        return
+    key, ttl_seconds = cache_key
+    if ttl_seconds > 0:
+        sql_result_cache.set(key, data_json, ttl_seconds=ttl_seconds)
+
+
+def invalidate_tables(tables: Optional[Iterable[str]] = None) -> None:
+    """
+    테이블을 참조하는 캐시 결과를 무효화합니다. (ETL 적재 후 호출)
+    tables 가 없으면 전체를 비웁니다.
+    """
+    global _epoch
+    if tables is None:
+        with _generation_lock:
+            _epoch += 1
+        sql_result_cache.clear()
+        logger.info("🧹 SQL 결과 캐시를 모두 비웠습니다.")
+        return
+
+    names = sorted({table.lower() for table in tables})
+    with _generation_lock:
+        for table in names:
+            _generations[table] = _generations.get(table, 0) + 1
+    logger.info(f"🧹 SQL 결과 캐시 무효화: {names}")
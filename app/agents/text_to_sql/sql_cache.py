@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from typing import FrozenSet, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.ttl_cache import InMemoryLRUBackend, TTLCache
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]  # (스키마 fingerprint, 정규화된 질문)
+
+# CacheKey -> 실행에 성공한 SQL
+sql_cache = TTLCache(
+    name="nl2sql",
+    backend=InMemoryLRUBackend(max_size=settings.SQL_CACHE_MAX_SIZE),
+    ttl_seconds=settings.SQL_CACHE_TTL_SECONDS,
+)
+
+_DATE_RE = re.compile(r"(\d{4})\s*(?:[-./]|년)\s*(\d{1,2})\s*(?:[-./]|월)\s*(\d{1,2})\s*일?")
+_LITERAL_RE = re.compile(r"'[^']*'|\"[^\"]*\"|\d+(?:\.\d+)?")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+# 단어 끝에서 떼어낼 조사 (긴 것부터)
+_PARTICLES = ("에서", "으로", "까지", "부터", "은", "는", "이", "가", "을", "를", "의", "에", "로", "와", "과", "도", "만")
+# 상대 기간 표현이 있으면 같은 질문이라도 날짜가 바뀌면 다른 SQL 이 되므로 키에 오늘 날짜를 넣습니다.
+_RELATIVE_TIME_RE = re.compile(r"최근|지난|오늘|어제|이번|올해|작년|금년|전년|전월|전주|당월|현재")
+
+
+def normalize_question(question: str) -> str:
+    """NFKC, 소문자, 공백 정리, 날짜 표기 통일 (2024.1.5 / 2024년 1월 5일 -> 2024-01-05)."""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _DATE_RE.sub(lambda m: f"{m.group(1)}-{int(m.group(2)):02d}-{int(m.group(3)):02d}", text)
+    text = " ".join(text.split())
+    if _RELATIVE_TIME_RE.search(text):
+        text = f"[{datetime.now(ZoneInfo('Asia/Seoul')).date().isoformat()}] {text}"
+    return text
+
+
+def schema_fingerprint(schema_info: str) -> str:
+    normalized = " ".join(unicodedata.normalize("NFKC", schema_info or "").split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _literals(normalized_question: str) -> List[str]:
+    return sorted(_LITERAL_RE.findall(normalized_question))
+
+
+def _terms(normalized_question: str) -> FrozenSet[str]:
+    """
+    값(literal)을 지운 질문의 단어 집합. 조사만 다르거나 어순만 바뀐 질문은 같은 집합이 되고,
+    따옴표 없이 쓴 브랜드/카테고리/채널 이름이 다르면 다른 집합이 됩니다.
+    """
+    text = _PUNCT_RE.sub(" ", _LITERAL_RE.sub(" ", normalized_question))
+    terms = set()
+    for word in text.split():
+        for particle in _PARTICLES:
+            if word.endswith(particle) and len(word) > len(particle):
+                word = word[: -len(particle)]
+                break
+        terms.add(word)
+    return frozenset(terms)
+
+
+class _SimilarityIndex:
+    """
+    정규화된 질문 임베딩 목록. 정확히 같은 질문이 없을 때 가장 비슷한 질문의 SQL 을 찾습니다.
+    브랜드/카테고리 이름만 다른 질문도 임베딩은 매우 비슷하므로, 점수와 관계없이
+    값(따옴표 안의 값, 숫자, 날짜)과 단어 집합(_terms)이 모두 같은 질문만 후보로 봅니다.
+    항목은 SQL 캐시와 따로 만료되지 않으므로, 호출 측이 후보의 캐시 항목을 확인하고 없으면 remove() 합니다.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # (fingerprint, 정규화된 질문) -> (literal 목록, 단어 집합, 정규화된 벡터)
+        self._entries: "OrderedDict[CacheKey, Tuple[List[str], FrozenSet[str], np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, fingerprint: str, question: str, vector: List[float]):
+        v = np.asarray(vector, dtype=np.float32)
+        v /= np.linalg.norm(v) or 1.0
+        with self._lock:
+            self._entries[(fingerprint, question)] = (_literals(question), _terms(question), v)
+            self._entries.move_to_end((fingerprint, question))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def remove(self, key: CacheKey):
+        with self._lock:
+            self._entries.pop(tuple(key), None)
+
+    def candidates(self, fingerprint: str, question: str, vector: List[float], threshold: float) -> List[str]:
+        """threshold 이상이면서 값과 단어 집합이 같은 질문을 점수가 높은 순서로 반환합니다."""
+        literals, terms = _literals(question), _terms(question)
+        with self._lock:
+            matched = [
+                (entry_question, v)
+                for (entry_fp, entry_question), (entry_literals, entry_terms, v) in self._entries.items()
+                if entry_fp == fingerprint and entry_literals == literals and entry_terms == terms
+            ]
+        if not matched:
+            return []
+
+        v = np.asarray(vector, dtype=np.float32)
+        v /= np.linalg.norm(v) or 1.0
+        scores = np.stack([m[1] for m in matched]) @ v
+        return [matched[i][0] for i in np.argsort(-scores) if scores[i] >= threshold]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_similar = _SimilarityIndex(max_size=settings.SQL_CACHE_MAX_SIZE)
+_current_fingerprint: Optional[str] = None
+
+
+def _embed(text: str) -> Optional[List[float]]:
+    from app.database.supabase import get_embeddings
+
+    embeddings = get_embeddings()
+    if embeddings is None:
+        return None
+    try:
+        return embeddings.embed_query(text)
+    except Exception as e:
+        logger.warning(f"⚠️ SQL 캐시 임베딩 실패: {e}")
+        return None
+
+
+def _check_schema(fingerprint: str):
+    """스키마가 바뀌면 이전 스키마로 만든 SQL 을 모두 버립니다."""
+    global _current_fingerprint
+    if _current_fingerprint is not None and _current_fingerprint != fingerprint:
+        logger.info(f"🧹 스키마 변경 감지, SQL 캐시를 비웁니다. ({_current_fingerprint} -> {fingerprint})")
+        clear_sql_cache()
+    _current_fingerprint = fingerprint
+
+
+def get_cached_sql(question: str, schema_info: str) -> Optional[Tuple[str, CacheKey]]:
+    """캐시된 SQL 과 그 캐시 키. 비슷한 질문으로 찾은 경우 키는 원래 질문의 키입니다."""
+    if not settings.SQL_CACHE_ENABLED:
+        return None
+
+    fingerprint = schema_fingerprint(schema_info)
+    _check_schema(fingerprint)
+    normalized = normalize_question(question)
+
+    key = (fingerprint, normalized)
+    sql = sql_cache.get(key)
+    if sql is not None:
+        logger.info(f"⚡ SQL 캐시 hit (exact): {normalized[:80]}")
+        return sql, key
+
+    if not settings.SQL_CACHE_SIMILARITY_ENABLED:
+        return None
+    vector = _embed(normalized)
+    if vector is None:
+        return None
+    for similar in _similar.candidates(fingerprint, normalized, vector, settings.SQL_CACHE_SIMILARITY_THRESHOLD):
+        key = (fingerprint, similar)
+        sql = sql_cache.get(key)
+        if sql is None:
+            # 만료/밀려난/무효화된 항목은 인덱스에서도 지웁니다.
+            _similar.remove(key)
+            continue
+        logger.info(f"⚡ SQL 캐시 hit (similar): {normalized[:80]} ~ {similar[:80]}")
+        return sql, key
+    return None
+
+
+def put_cached_sql(question: str, schema_info: str, sql: str) -> None:
+    """실행에 성공한 SQL 만 저장합니다. (호출 측 책임)"""
+    if not settings.SQL_CACHE_ENABLED or not sql:
+        return
+
+    fingerprint = schema_fingerprint(schema_info)
+    _check_schema(fingerprint)
+    normalized = normalize_question(question)
+    key = (fingerprint, normalized)
+    if sql_cache.backend.get(key) is not None:
+        return
+    sql_cache.set(key, sql)
+
+    if settings.SQL_CACHE_SIMILARITY_ENABLED and (vector := _embed(normalized)) is not None:
+        _similar.add(fingerprint, normalized, vector)
+
+
+def invalidate_cached_sql(key: CacheKey) -> None:
+    """캐시에서 꺼낸 SQL 이 실행에 실패했을 때 호출합니다."""
+    sql_cache.invalidate(tuple(key))
+    _similar.remove(key)
+
+
+def clear_sql_cache() -> None:
+    sql_cache.clear()
+    _similar.clear()
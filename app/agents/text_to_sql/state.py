@@ -7,6 +7,8 @@ class SQLState(BaseModel):
     schema_info: str 
     conn_str: str
     graph_type: str = ""
+    output_type: str = "table"  # table | visualize | export
+    generation_mode: str = "crew"  # fast: 단일 LLM 호출 후 실패 시 crew | crew: 항상 crew 파이프라인
 
     # 루프 로직 
     tried: int = 0
@@ -14,6 +16,8 @@ class SQLState(BaseModel):
 
     # 만드는 값
     query: Optional[Any] = None
+    sql_cache_key: Optional[Any] = None  # 캐시에서 꺼낸 SQL 이면 그 캐시 키
+    generator: Optional[str] = None  # 마지막 SQL 을 만든 경로 (cache | fast | crew)
     data_json: Optional[Any] = None
     graph_json: Optional[str] = None
-    dataframe: Optional[Any] = None  # DataFrame 객체 (export용)
\ No newline at end of file
+    export_path: Optional[str] = None  # 전체 결과 임시 CSV 경로 (export 일 때만)
\ No newline at end of file
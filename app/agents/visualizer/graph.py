@@ -11,6 +11,7 @@ from google.genai import types as genai_types
 from typing import Optional
 
 from .state import VisualizeState
+from app.agents.progress import with_node_progress
 from app.core.config import settings
 
 # ===== Helper =====
@@ -267,8 +268,8 @@ def build_visualize_graph(model: str):
     llm = GeminiClient(model)
     g = StateGraph(VisualizeState)
 
-    g.add_node("visualize", lambda s: node_visualize(s, llm))
-    g.add_node("explain", lambda s: node_explain(s, llm))
+    g.add_node("visualize", with_node_progress("visualize", lambda s: node_visualize(s, llm)))
+    g.add_node("explain", with_node_progress("explain", lambda s: node_explain(s, llm)))
 
     g.set_entry_point("visualize")
     g.add_edge('visualize', 'explain')
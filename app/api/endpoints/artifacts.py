@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Path
+from fastapi.responses import Response
+from starlette import status
+import asyncio
+
+from app.utils.artifact_store import ARTIFACT_ID_RE, get_artifact_store
+
+router = APIRouter(prefix="/artifacts", tags=["Artifacts"])
+
+@router.get("/{artifact_id}", summary="Get Artifact")
+async def get_artifact(artifact_id: str = Path(...)):
+    """메시지의 graph_data_ref / plan_data_ref 가 가리키는 payload 를 반환합니다."""
+    store = get_artifact_store()
+    if store is None or not ARTIFACT_ID_RE.match(artifact_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Artifact '{artifact_id}' not found.")
+
+    artifact = await asyncio.to_thread(store.get, artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Artifact '{artifact_id}' not found.")
+
+    # 내용 해시가 키이므로 같은 id 의 내용은 바뀌지 않습니다.
+    data, content_type = artifact
+    return Response(
+        content=data,
+        media_type=content_type,
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{artifact_id}"'},
+    )
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Body
+
+from app.agents.text_to_sql.result_cache import invalidate_tables
+from app.schema.cache import InvalidateSqlResultsRequest
+
+router = APIRouter(prefix="/cache", tags=["Cache"])
+
+@router.post("/sql-results/invalidate", summary="Invalidate SQL Result Cache")
+async def invalidate_sql_results(request: InvalidateSqlResultsRequest = Body(default_factory=InvalidateSqlResultsRequest)):
+    """ETL 이 테이블(예: orders, ad_daily)을 적재한 뒤 호출합니다. tables 를 비우면 전체를 비웁니다."""
+    invalidate_tables(request.tables)
+    return {"invalidated": request.tables if request.tables is not None else "all"}
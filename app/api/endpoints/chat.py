@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Body, Path, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Body, Path, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from starlette import status
 import json
 import asyncio
+import logging
 import uuid 
+from typing import Optional
 
 from app.agents.__init__ import stream_agent
 from app.agents.orchestrator.state import PromotionSlots, ActiveTask
@@ -11,35 +13,77 @@ from app.agents.formatter.grapy import create_plan_from_promotion_slots
 from app.schema.chat import ChatRequest, NewChatRequest, CreatePlanRequest
 from app.core.config import settings
 from app.database.chat_history import *
-from app.database.promotion_slots import get_or_create_state
-from app.service.chat_service import generate_chat_title, stream_and_save_wrapper
+from app.database.promotion_slots import adelete_state
+from app.service.chat_deletion import delete_chat_cascade
+from app.service.chat_service import generate_and_save_chat_title, stream_and_save_wrapper
+from app.service.stream_bridge import stream_until_disconnect
+from app.service.stream_registry import stream_registry
+from app.service.turn_context import aload_turn_context
+from app.utils.sse import encode_sse
 from app.mock import get_mock_response, mock_stream_with_save 
 from app.mock.plan import mock_create_plan
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 @router.post("/new")
-async def new_chat_stream(request: NewChatRequest = Body(...)):
+async def new_chat_stream(background_tasks: BackgroundTasks, request: NewChatRequest = Body(...)):
+
+    # 임시 제목으로 채팅을 먼저 만들고, 제목은 응답 후 백그라운드에서 생성합니다.
+    chat_id = await acrete_chat(user_id=request.user_id, title=PROVISIONAL_CHAT_TITLE, title_status="pending")
+    if chat_id:
+        background_tasks.add_task(generate_and_save_chat_title, chat_id, request.message)
 
-    chat_title = await generate_chat_title(request.message)
-    chat_id = crete_chat(user_id=request.user_id, title=chat_title)
+    return {"chatId": chat_id, "title": PROVISIONAL_CHAT_TITLE}
+
+@router.get("/{chat_id}/title", summary="Get Chat Title")
+async def get_chat_title(chat_id: str = Path(...)):
+    chat = await aget_chat(chat_id)
+    if not chat:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat with chat_id '{chat_id}' not found."
+        )
 
-    return {"chatId": chat_id}
+    return {
+        "chatId": chat_id,
+        "title": chat.get("title"),
+        "titleStatus": chat.get("title_status", "ready"),
+    }
 
 @router.post("/stream")
-async def chat_stream(request: ChatRequest = Body(...)):
+async def chat_stream(http_request: Request, request: ChatRequest = Body(...)):
+
+    # 재연결: Last-Event-ID 가 있고 같은 턴(같은 메시지)이면 실행 중인 세션에 다시 붙거나 버퍼에서 재전송합니다.
+    last_event_id = http_request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        resumed = await stream_registry.resume(request.chat_id, int(last_event_id), request.user_message)
+        if resumed is not None:
+            return StreamingResponse(stream_until_disconnect(http_request, resumed), media_type="text/event-stream")
 
     if mock_response := get_mock_response(request.user_message, request.chat_id):
+        if not await aget_chat(request.chat_id):
+            logger.warning(f"⚠️ 없거나 삭제된 채팅이라 턴을 받지 않습니다. (chat_id: {request.chat_id})")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Chat with chat_id '{request.chat_id}' not found.")
         final_stream = mock_stream_with_save(request.chat_id, request.user_message, mock_response)
-        return StreamingResponse(final_stream, media_type="text/event-stream")
-
-    history = get_chat_history(chat_id=request.chat_id)
-    slots = get_or_create_state(chat_id=request.chat_id)
+        session = stream_registry.start(request.chat_id, request.user_message, encode_sse(final_stream))
+        return StreamingResponse(stream_until_disconnect(http_request, session.subscribe()), media_type="text/event-stream")
+
+    context = await aload_turn_context(request.chat_id)
+    if not context.chat_found:
+        # 없거나 삭제 중인 채팅에는 새 턴을 받지 않습니다. 메시지 저장 시 채팅 문서를 만들지 않으므로(upsert 없음)
+        # 여기서 거절하지 않으면 응답이 저장되지 않고 사라집니다. 상태는 함께 불러오면서 만들어졌을 수 있으므로 지웁니다.
+        logger.warning(f"⚠️ 없거나 삭제된 채팅이라 턴을 받지 않습니다. (chat_id: {request.chat_id})")
+        await adelete_state(request.chat_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Chat with chat_id '{request.chat_id}' not found.")
+    history, slots = context.history, context.state
 
     current_active_task = ActiveTask(
         task_id=request.chat_id,
         status="in_progress",
-        slots=PromotionSlots(**slots)
+        slots=PromotionSlots(**slots),
+        state_version=slots.get("version", 0)
     )
 
     response_stream = stream_agent(
@@ -48,33 +92,59 @@ async def chat_stream(request: ChatRequest = Body(...)):
         active_task=current_active_task, 
         conn_str=settings.CONN_STR, 
         schema_info=settings.SCHEMA_INFO, 
-        message=request.user_message
+        message=request.user_message,
+        conversation_summary=context.summary,
+        conversation_summary_until=context.summary_until,
     )
     
     final_stream = stream_and_save_wrapper(request.chat_id, request.user_message, response_stream)
+    session = stream_registry.start(request.chat_id, request.user_message, encode_sse(final_stream))
 
-    return StreamingResponse(final_stream, media_type="text/event-stream")
-
-@router.delete("/{chat_id}", summary="Delete Chat History")
-def delete_chat(chat_id: str = Path(...)):
-    deleted_count = delete_chat_history(chat_id=chat_id)
+    return StreamingResponse(
+        stream_until_disconnect(http_request, session.subscribe()),
+        media_type="text/event-stream",
+        headers={"Server-Timing": context.server_timing()},
+    )
 
-    if deleted_count:
-        return {
-            "message": "Chat history deleted successfully.",
-            "chat_id": chat_id,
-        }
+@router.get("/{chat_id}/messages", summary="Get Chat Messages")
+async def get_chat_messages(
+    chat_id: str = Path(...),
+    cursor: Optional[str] = Query(None, description="이전 응답의 nextCursor. 없으면 최신 메시지부터"),
+    limit: int = Query(20, ge=1, le=MESSAGE_PAGE_MAX_LIMIT),
+    include_artifacts: bool = Query(True, alias="includeArtifacts", description="false 면 graph_data/plan_data 제외"),
+):
+    try:
+        page = await aget_messages_page(chat_id, cursor=cursor, limit=limit, include_artifacts=include_artifacts)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "chatId": chat_id,
+        "messages": page["messages"],
+        "nextCursor": page["next_cursor"],
+    }
 
-    else:
+@router.delete("/{chat_id}", summary="Delete Chat History", status_code=status.HTTP_202_ACCEPTED)
+async def delete_chat(background_tasks: BackgroundTasks, chat_id: str = Path(...)):
+    # 삭제 표시만 하고 바로 응답합니다. 메시지/상태/artifact 는 백그라운드에서 배치로 삭제합니다.
+    if not await amark_chat_deleted(chat_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Chat history with thread_id '{chat_id}' not found."
         )
 
+    background_tasks.add_task(delete_chat_cascade, chat_id)
+    return {
+        "message": "Chat history deletion accepted.",
+        "chat_id": chat_id,
+    }
+
 @router.post("/createPlan")
-def create_plan(request: CreatePlanRequest):
+async def create_plan(request: CreatePlanRequest):
     chat_id = request.chat_id 
-    active_state = get_or_create_state(chat_id=chat_id)
+    # 기획서 내용은 최근 어시스턴트 메시지에서 찾으므로 대화 요약은 필요 없습니다.
+    context = await aload_turn_context(chat_id, history_limit=10, include_summary=False)
+    active_state = context.state
 
     # 프로모션 슬롯 데이터 추출
     promotion_slots = {
@@ -89,7 +159,7 @@ def create_plan(request: CreatePlanRequest):
     }
     
     # 최근 채팅 히스토리에서 프로모션 기획 내용 추출
-    history = get_chat_history(chat_id=chat_id)
+    history = context.history
     promotion_content = ""
     
     # 최근 어시스턴트 메시지에서 프로모션 내용 찾기
@@ -109,7 +179,7 @@ def create_plan(request: CreatePlanRequest):
     
     try:
         # formatter를 통해 실제 plan 데이터 생성
-        plan_data = create_plan_from_promotion_slots(promotion_slots, promotion_content)
+        plan_data = await asyncio.to_thread(create_plan_from_promotion_slots, promotion_slots, promotion_content)
         
         # plan_data에서 final_exam 추출하여 반환
         final_exam = plan_data.get('final_exam', [])
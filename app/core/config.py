@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 PROFILE = os.getenv("PROFILE", "local")
@@ -13,6 +14,54 @@ class Settings(BaseSettings):
     LOG_LEVEL: str
     
     COSMOS_DB_CONNECTION_STRING: str
+    MONGO_DB_NAME: str = "minti"
+    MONGO_MAX_POOL_SIZE: int = 100                # 비동기 클라이언트 (요청 경로)
+    MONGO_SYNC_MAX_POOL_SIZE: int = 4             # 동기 클라이언트 (메시지 write-behind 워커, 인덱스 관리)
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 20000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5000       # 풀이 가득 찼을 때 커넥션을 기다리는 최대 시간
+    MONGO_ENSURE_INDEXES_ON_STARTUP: bool = True
+    MONGO_AUDIT_QUERY_PLANS_ON_STARTUP: bool = False  # True 면 핫 쿼리가 COLLSCAN 일 때 기동 실패
+
+    # 외부 리소스(DB, SDK 클라이언트) 지연 초기화
+    RESOURCE_WARMUP_ON_STARTUP: bool = True       # 기동 시 미리 연결하고 소요 시간을 기록
+    RESOURCE_RETRY_SECONDS: float = 10.0          # 초기화 실패 후 다시 시도하기까지의 시간
+    RESOURCE_PROBE_TIMEOUT_SECONDS: float = 3.0   # health probe 타임아웃
+
+    # text-to-SQL 대상 DB 커넥션 풀 (conn_str 별 엔진 공유)
+    SQL_POOL_SIZE: int = 5
+    SQL_MAX_OVERFLOW: int = 10
+    SQL_POOL_TIMEOUT_SECONDS: float = 30.0
+    SQL_POOL_RECYCLE_SECONDS: int = 1800          # 오래된 커넥션을 다시 맺는 주기 (서버/프록시 idle timeout 보다 짧게)
+    SQL_FETCH_CHUNK_ROWS: int = 1000              # server-side cursor 에서 한 번에 읽는 행 수
+    SQL_COUNT_MAX_ROWS: int = 100000              # export 가 아닐 때 행 수를 세는 최대 행 수 (넘으면 근사값)
+    SQL_EXPORT_SPOOL_DIR: str = ""                # export CSV 임시 디렉터리 (비우면 시스템 임시 디렉터리)
+
+    # SQL 생성 방식: fast(단일 LLM 호출, 검증/실행 실패 시 crew) | crew(2단계 CrewAI 파이프라인)
+    # benchmarks/sql_generation.py 에서 fast 의 정확도가 crew 와 같게 나오기 전까지는 crew 를 기본으로 둡니다.
+    SQL_GENERATION_MODE: str = "crew"
+    SQL_FAST_MODEL: str = "gemini-2.5-flash"
+
+    # NL -> SQL 캐시 (정규화된 질문 + 스키마 fingerprint -> 실행에 성공한 SQL)
+    SQL_CACHE_ENABLED: bool = True
+    SQL_CACHE_MAX_SIZE: int = 1000
+    SQL_CACHE_TTL_SECONDS: float = 86400.0
+    SQL_CACHE_SIMILARITY_ENABLED: bool = False      # 임베딩 유사도 조회 (임베딩 호출 비용이 추가됨)
+    SQL_CACHE_SIMILARITY_THRESHOLD: float = 0.97
+
+    # SQL 결과 캐시 (정규화된 SQL -> 미리보기 + row_count)
+    SQL_RESULT_CACHE_ENABLED: bool = True
+    SQL_RESULT_CACHE_MAX_SIZE: int = 500
+    SQL_RESULT_CACHE_TTL_SECONDS: float = 600.0
+    # 테이블별 TTL (JSON, 예: {"orders": 300, "ad_daily": 3600}). 여러 테이블을 참조하면 가장 짧은 TTL, 0 이면 캐시하지 않음
+    SQL_RESULT_CACHE_TABLE_TTLS: Dict[str, float] = {}
+
+    # 프로모션 상태 캐시 (chat_id 별 states 문서)
+    STATE_CACHE_MAX_SIZE: int = 1000
+    STATE_CACHE_TTL_SECONDS: float = 60.0
 
     SUPERBASE_URL: str
     SUPABASE_ANON_KEY: str
@@ -27,6 +76,45 @@ class Settings(BaseSettings):
     
     AZURE_STORAGE_CONNECTION_STRING: str = ""
     AZURE_STORAGE_CONTAINER_NAME: str = "exports"
+
+    # 그래프/기획서 payload 저장소 ("blob" | "local" | "inline", 비워두면 inline: 메시지 문서에 그대로 저장)
+    ARTIFACT_STORE_BACKEND: str = ""
+    ARTIFACT_BLOB_CONTAINER_NAME: str = "artifacts"
+    ARTIFACT_LOCAL_DIR: str = "/tmp/minti-artifacts"
+    ARTIFACT_INLINE_MAX_BYTES: int = 2048           # 이 크기 이하는 메시지 문서에 그대로 저장
+    
+    # SSE 스트리밍 설정 (응답 텍스트를 묶어서 전송, MAX_CHARS=1 이면 문자 단위 전송)
+    STREAM_FLUSH_MAX_CHARS: int = 256
+    STREAM_FLUSH_INTERVAL_MS: int = 20
+    STREAM_MAX_BUFFERED_FRAMES: int = 64          # 클라이언트가 느릴 때 메모리에 보관할 최대 프레임 수
+    STREAM_DISCONNECT_POLL_SECONDS: float = 1.0   # 연결 종료 확인 주기
+    STREAM_REPLAY_BUFFER_SIZE: int = 512          # 채팅별 재전송 ring buffer 크기 (프레임 수)
+    STREAM_REPLAY_MAX_CHATS: int = 1000           # 재전송 버퍼를 보관할 최대 채팅 수
+    STREAM_REPLAY_MAX_BYTES_PER_CHAT: int = 4 * 1024 * 1024   # 채팅별 재전송 버퍼 최대 크기
+    STREAM_REPLAY_MAX_TOTAL_BYTES: int = 64 * 1024 * 1024     # 전체 재전송 버퍼 최대 크기 (넘으면 오래된 채팅부터 제거)
+    STREAM_RESUME_GRACE_SECONDS: float = 30.0     # 연결이 끊긴 뒤 재연결을 기다리는 시간
+
+    # 채팅 메시지 write-behind 저장 설정
+    MESSAGE_WRITE_QUEUE_SIZE: int = 1000                # 저장 대기 중인 최대 턴 수
+    MESSAGE_WRITE_BATCH_SIZE: int = 50                  # 한 번에 저장할 최대 턴 수
+    MESSAGE_WRITE_LINGER_MS: int = 50                   # 배치를 채우기 위해 기다리는 시간
+    MESSAGE_WRITE_MAX_RETRIES: int = 3
+    MESSAGE_WRITE_RETRY_BACKOFF_SECONDS: float = 0.5
+    MESSAGE_WRITE_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0
+
+    # 채팅별 rolling 대화 요약 (턴이 끝난 뒤 백그라운드에서 갱신)
+    CHAT_SUMMARY_ENABLED: bool = True
+    CHAT_SUMMARY_MAX_CHARS: int = 1500
+    CHAT_SUMMARY_INPUT_MAX_CHARS: int = 4000        # 요약에 넣는 한 메시지의 최대 길이
+    CHAT_CONTEXT_RECENT_MESSAGES: int = 10          # 원문으로 불러올 최근 메시지 수 (요약에 반영되지 않은 메시지만 LLM 에 전달)
+
+    # 채팅 삭제 (백그라운드에서 배치 단위로 삭제)
+    CHAT_DELETE_BATCH_SIZE: int = 500
+
+    # 백그라운드 LLM 작업(채팅 제목 생성 등) 설정
+    BACKGROUND_LLM_CONCURRENCY: int = 2             # 동시에 실행할 최대 호출 수
+    BACKGROUND_LLM_BUSY_STREAMS: int = 20           # 실행 중인 스트림이 이 수 이상이면 양보
+    BACKGROUND_LLM_MAX_DEFER_SECONDS: float = 30.0  # 최대 양보 시간
     
     # Mock 모드 설정 (기본값: False)
     ENABLE_MOCK_MODE: bool = True
@@ -0,0 +1,141 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Resource:
+    name: str
+    factory: Callable[[], Any]
+    probe: Optional[Callable[[Any], Any]] = None   # 연결 확인 (sync 또는 async)
+    close: Optional[Callable[[Any], Any]] = None   # 종료 시 정리 (sync 또는 async)
+    instance: Any = None
+    error: Optional[str] = None
+    failed_at: float = 0.0
+    init_ms: Optional[float] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ResourceRegistry:
+    """
+    외부 연결(DB, SDK 클라이언트)을 처음 사용할 때 생성하는 레지스트리.
+
+    - import 시점에는 아무것도 연결하지 않습니다. get() 에서 factory 를 한 번만 실행합니다.
+    - factory 가 실패하면 None 을 반환하고(graceful degradation), RESOURCE_RETRY_SECONDS 뒤에 다시 시도합니다.
+    - warmup() 은 기동 시 명시적으로 생성하고 소요 시간을 기록합니다.
+    - health() 는 각 리소스의 probe 를 실행해 상태를 반환합니다.
+    """
+
+    def __init__(self, retry_seconds: float, probe_timeout_seconds: float):
+        self.retry_seconds = retry_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self._resources: Dict[str, Resource] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        probe: Optional[Callable[[Any], Any]] = None,
+        close: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        self._resources[name] = Resource(name=name, factory=factory, probe=probe, close=close)
+
+    def get(self, name: str) -> Any:
+        resource = self._resources[name]
+        if resource.instance is not None:
+            return resource.instance
+
+        with resource.lock:
+            if resource.instance is not None:
+                return resource.instance
+            if resource.error and time.monotonic() - resource.failed_at < self.retry_seconds:
+                return None
+
+            start = time.perf_counter()
+            try:
+                resource.instance = resource.factory()
+                resource.error = None
+            except Exception as e:
+                resource.error = str(e)
+                resource.failed_at = time.monotonic()
+                logger.error(f"❌ 리소스 초기화 실패: {name}: {e}")
+                return None
+            finally:
+                resource.init_ms = round((time.perf_counter() - start) * 1000, 1)
+
+            logger.info(f"✅ 리소스 초기화 완료: {name} ({resource.init_ms}ms)")
+            return resource.instance
+
+    async def warmup(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """리소스를 생성하고 probe 까지 실행합니다. 리소스별 결과와 소요 시간을 반환합니다."""
+        names = list(names or self._resources)
+        results = await asyncio.gather(*(self._warmup_one(name) for name in names))
+        report = dict(zip(names, results))
+        logger.info(f"🔥 워밍업 완료: {report}")
+        return report
+
+    async def _warmup_one(self, name: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        instance = await asyncio.to_thread(self.get, name)
+        result = {"ok": instance is not None, "error": self._resources[name].error}
+        if instance is not None:
+            result.update(await self._probe(self._resources[name]))
+        result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async def _probe(self, resource: Resource) -> Dict[str, Any]:
+        if resource.probe is None or resource.instance is None:
+            return {}
+        try:
+            if inspect.iscoroutinefunction(resource.probe):
+                await asyncio.wait_for(resource.probe(resource.instance), timeout=self.probe_timeout_seconds)
+            else:
+                await asyncio.wait_for(
+                    asyncio.to_thread(resource.probe, resource.instance), timeout=self.probe_timeout_seconds
+                )
+            return {"ok": True}
+        except Exception as e:
+            return {"ok": False, "error": str(e) or type(e).__name__}
+
+    async def health(self) -> Dict[str, Dict[str, Any]]:
+        """
+        초기화된 리소스는 probe 결과를, 아직 사용되지 않은 리소스는 "idle" 로 보고합니다.
+        health 확인 때문에 새 연결을 만들지는 않습니다.
+        """
+        names = list(self._resources)
+        results = await asyncio.gather(*(self._health_one(self._resources[name]) for name in names))
+        return dict(zip(names, results))
+
+    async def _health_one(self, resource: Resource) -> Dict[str, Any]:
+        if resource.instance is None:
+            return {"ok": resource.error is None, "status": "failed" if resource.error else "idle", "error": resource.error}
+        start = time.perf_counter()
+        result = {"ok": True, "status": "ready", **(await self._probe(resource))}
+        result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async def close_all(self) -> None:
+        for resource in self._resources.values():
+            if resource.instance is None or resource.close is None:
+                continue
+            try:
+                result = resource.close(resource.instance)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"⚠️ 리소스 정리 실패: {resource.name}: {e}")
+            resource.instance = None
+
+
+resources = ResourceRegistry(
+    retry_seconds=settings.RESOURCE_RETRY_SECONDS,
+    probe_timeout_seconds=settings.RESOURCE_PROBE_TIMEOUT_SECONDS,
+)
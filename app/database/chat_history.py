@@ -1,168 +1,373 @@
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from .connection import db  
+from .connection import get_db, get_async_db
+from app.utils.artifact_store import ARTIFACT_FIELDS, offload_message_artifacts
 from pymongo.results import InsertManyResult, UpdateResult, InsertOneResult, DeleteResult
-from pymongo import DESCENDING
-from typing import Optional
+from pymongo.errors import BulkWriteError
+from pymongo import DESCENDING, ReturnDocument
+from typing import Any, Dict, List, Optional, Set, Tuple
 import logging 
 import uuid
 
 logger = logging.getLogger(__name__)
 
+DUPLICATE_KEY_ERROR = 11000
 
-def crete_chat(user_id: str, title:str):
-    if db is None:
-        logger.error("DB에 연결되지 않아 메시지를 저장할 수 없습니다.")
-        return None
-    
-    try:
-        collection = db.chats
-        now = datetime.now(ZoneInfo("Asia/Seoul"))
 
-        chat_data = { 
-            "chat_id": uuid.uuid4().hex,
-            "user_id": user_id,
-            "title": title,
-            "created_at": now,
-            "last_updated": now,
-            "message_ids": []
-        }
+PROVISIONAL_CHAT_TITLE = "새로운 대화"
 
-        result: InsertOneResult = collection.insert_one(chat_data)
+# 최신 메시지부터. seq 가 없는 이전 메시지는 timestamp 로 정렬됩니다.
+HISTORY_SORT = [("seq", DESCENDING), ("timestamp", DESCENDING)]
 
-        if result.inserted_id:
-            new_chat_id = chat_data["chat_id"]
-            logger.info(f"✅ Successfully created a new chat for user '{user_id}' with chat_id: {new_chat_id}")
-            return new_chat_id
+# LLM 컨텍스트처럼 텍스트만 필요할 때 무거운 필드(Plotly JSON 등)를 제외합니다.
+TEXT_ONLY_PROJECTION = {"graph_data": 0, "plan_data": 0, "graph_data_ref": 0, "plan_data_ref": 0}
+MESSAGE_PAGE_MAX_LIMIT = 100
 
-        else:
-            logger.error(f"Failed to create a chat for user '{user_id}'.")
-            return None
+def _history_projection(include_artifacts: bool) -> Optional[Dict[str, int]]:
+    return None if include_artifacts else TEXT_ONLY_PROJECTION
 
-    except Exception as e:
-        logger.error(f"❌ An error occurred while creating a chat for user '{user_id}': {e}")
-        return None
-        
-def save_chat_message(chat_id: str, user_message: str, agent_message: str, graph_data, plan_data: Optional[str]):
-    if db is None:
-        logger.error("DB에 연결되지 않아 메시지를 저장할 수 없습니다.")
-        return None
+def _page_query(chat_id: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    keyset 조건. cursor 는 이전 페이지의 가장 오래된 메시지 위치입니다.
+      - "s:<seq>":       seq 가 그보다 작은 메시지 + seq 가 없는 이전 메시지
+      - "t:<ISO 시각>":   seq 가 없는 이전 메시지 중 그보다 이른 메시지
+    """
+    query: Dict[str, Any] = {"chat_id": chat_id}
+    if not cursor:
+        return query
 
-    try:
-        print("graph_data: ", graph_data)
-        
-        collection = db.messages
-        base_time = datetime.now(ZoneInfo("Asia/Seoul"))
-        
-        # 유저 메시지 먼저 저장 (더 이른 타임스탬프)
-        user_message_data = {
-            "message_id": uuid.uuid4().hex,
+    kind, _, value = cursor.partition(":")
+    if kind == "s":
+        query["$or"] = [{"seq": {"$lt": int(value)}}, {"seq": None}]
+    elif kind == "t":
+        query["seq"] = None
+        query["timestamp"] = {"$lt": datetime.fromisoformat(value)}
+    else:
+        raise ValueError(f"잘못된 cursor 입니다: {cursor}")
+    return query
+
+def _page_result(docs: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = None
+    if has_more:
+        oldest = docs[-1]
+        next_cursor = f"s:{oldest['seq']}" if oldest.get("seq") is not None else f"t:{oldest['timestamp'].isoformat()}"
+    docs.reverse()  # 오래된 메시지부터
+    return {"messages": docs, "next_cursor": next_cursor}
+
+CHAT_PROJECTION = {"_id": 0, "chat_id": 1, "user_id": 1, "title": 1, "title_status": 1, "created_at": 1, "last_updated": 1}
+
+def _new_chat_document(user_id: str, title: str, title_status: str) -> Dict[str, Any]:
+    now = datetime.now(ZoneInfo("Asia/Seoul"))
+    return {
+        "chat_id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "title": title,
+        "title_status": title_status,  # pending: 제목 생성 중, ready: 생성 완료
+        "created_at": now,
+        "last_updated": now,
+        "message_count": 0,  # 메시지 순번(seq) 카운터. 메시지 id 목록은 채팅 문서에 두지 않습니다.
+        "summary": "",  # 대화 rolling 요약 (턴마다 백그라운드에서 갱신)
+        "summary_version": 0,
+        "summary_until": None,  # 요약에 반영된 마지막 턴의 메시지 시각 (watermark)
+    }
+
+def build_message_documents(chat_id: str, user_message: str, agent_message: str, graph_data, plan_data: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    한 턴(유저 메시지 + AI 메시지)의 메시지 문서를 만듭니다.
+    _id 에 message_id 를 사용해 재시도해도 중복 저장되지 않으며, 순서는 저장 시 할당되는 seq 로 정해집니다.
+    """
+    base_time = datetime.now(ZoneInfo("Asia/Seoul"))
+    user_message_id, ai_message_id = uuid.uuid4().hex, uuid.uuid4().hex
+
+    return [
+        {
+            "_id": user_message_id,
+            "message_id": user_message_id,
             "chat_id": chat_id,
             "speaker": "user",
             "timestamp": base_time,
             "content": user_message,
             "graph_data": None,
             "plan_data": None
-        }
-        
-        user_result = collection.insert_one(user_message_data)
-        if not user_result.acknowledged:
-            logger.error(f"Failed to save user message for chat_id '{chat_id}'.")
-            return False
-            
-        # AI 메시지는 약간의 시간 간격을 두고 저장 (더 늦은 타임스탬프)
-        ai_message_data = {
-            "message_id": uuid.uuid4().hex,
+        },
+        {
+            "_id": ai_message_id,
+            "message_id": ai_message_id,
             "chat_id": chat_id,
             "speaker": "ai",
-            "timestamp": base_time.replace(microsecond=base_time.microsecond + 1000),  # 1ms 후
+            "timestamp": base_time,
             "content": agent_message,
             "graph_data": graph_data,
             "plan_data": plan_data
-        }
-        
-        ai_result = collection.insert_one(ai_message_data)
-        if not ai_result.acknowledged:
-            logger.error(f"Failed to save AI message for chat_id '{chat_id}'.")
-            return False
+        },
+    ]
 
-        inserted_message_ids = [user_message_data["message_id"], ai_message_data["message_id"]]
+def _allocate_seq(collection, message_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    아직 seq 가 없는 문서에 채팅별 순번을 할당하고, 저장할 문서를 반환합니다. (채팅당 find_one_and_update 1회)
+    채팅 문서가 없거나 삭제 표시된 채팅의 메시지는 제외합니다. (삭제 후 늦게 도착한 턴이 채팅을 되살리지 않도록)
+    같은 문서 객체로 재시도하면 이미 할당된 seq 를 그대로 사용합니다.
 
-        chats_collection = db.chats
-        update_result: UpdateResult = chats_collection.update_one(
-            {"chat_id": chat_id},
+    카운터 증가와 메시지 insert 는 별도 쓰기이므로, insert 가 끝내 실패한 배치의 seq 는 비게 됩니다.
+    seq 는 정렬/cursor 용 순번이라 연속일 필요는 없습니다.
+    """
+    by_chat: Dict[str, List[Dict[str, Any]]] = {}
+    for doc in message_docs:
+        if "seq" not in doc:
+            by_chat.setdefault(doc["chat_id"], []).append(doc)
+
+    skipped: Set[str] = set()
+    for chat_id, docs in by_chat.items():
+        chat = collection.find_one_and_update(
+            {"chat_id": chat_id, "deleted_at": None},
             {
-                "$push": {
-                    "message_ids": {
-                        "$each": inserted_message_ids
-                    }
-                },
-                "$set": { 
-                    "last_updated": base_time 
-                }
+                "$inc": {"message_count": len(docs)},
+                "$max": {"last_updated": max(doc["timestamp"] for doc in docs)},
+                "$unset": {"message_ids": ""},  # 기존 채팅 문서의 id 배열 정리
             },
-            upsert=True 
+            projection={"_id": 0, "message_count": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if chat is None:
+            logger.warning(f"⚠️ 채팅이 없거나 삭제 중이어서 메시지 {len(docs)}개를 저장하지 않습니다. (chat_id: {chat_id})")
+            skipped.add(chat_id)
+            continue
+        first_seq = chat["message_count"] - len(docs) + 1
+        for offset, doc in enumerate(docs):
+            doc["seq"] = first_seq + offset
+
+    return [doc for doc in message_docs if doc["chat_id"] not in skipped]
+
+def insert_message_batch(message_docs: List[Dict[str, Any]]) -> None:
+    """
+    여러 채팅의 메시지 문서를 저장합니다.
+    채팅별 seq 할당(카운터 증가 + last_updated 갱신) 후 insert_many 한 번으로 기록합니다.
+    채팅 문서가 없거나 삭제 표시된 채팅의 메시지는 저장하지 않습니다. (없는 채팅의 턴은 /chat/stream 에서 404 로 거절)
+    insert 는 ordered=False 로 실행해, 재시도 시 이미 저장된 문서(중복 키)만 건너뛰고 나머지를 저장합니다.
+    그 외 오류는 호출 측에서 재시도하도록 예외를 올립니다.
+    """
+    db = get_db()
+    if db is None:
+        raise ConnectionError("DB에 연결되지 않아 메시지를 저장할 수 없습니다.")
+    if not message_docs:
+        return
+
+    message_docs = _allocate_seq(db.chats, message_docs)
+    if not message_docs:
+        return
+    # 큰 graph_data/plan_data 는 artifact store 로 옮기고 참조만 저장합니다.
+    offload_message_artifacts(message_docs)
+
+    try:
+        db.messages.insert_many(message_docs, ordered=False)
+    except BulkWriteError as e:
+        errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY_ERROR]
+        if errors or e.details.get("writeConcernErrors"):
+            raise
+
+# =============================================================================
+# 비동기 repository (이벤트 루프에서 호출). 메시지 저장(insert_message_batch)만 write-behind 워커 스레드에서 동기로 실행합니다.
+# =============================================================================
+
+async def acrete_chat(user_id: str, title: str, title_status: str = "ready"):
+    adb = get_async_db()
+    if adb is None:
+        logger.error("DB에 연결되지 않아 메시지를 저장할 수 없습니다.")
+        return None
+
+    try:
+        chat_data = _new_chat_document(user_id, title, title_status)
+        result: InsertOneResult = await adb.chats.insert_one(chat_data)
+
+        if result.inserted_id:
+            new_chat_id = chat_data["chat_id"]
+            logger.info(f"✅ Successfully created a new chat for user '{user_id}' with chat_id: {new_chat_id}")
+            return new_chat_id
+
+        logger.error(f"Failed to create a chat for user '{user_id}'.")
+        return None
+
+    except Exception as e:
+        logger.error(f"❌ An error occurred while creating a chat for user '{user_id}': {e}")
+        return None
+
+async def aupdate_chat_title(chat_id: str, title: str) -> bool:
+    adb = get_async_db()
+    if adb is None:
+        logger.error("DB에 연결되지 않아 제목을 저장할 수 없습니다.")
+        return False
+
+    try:
+        result: UpdateResult = await adb.chats.update_one(
+            {"chat_id": chat_id},
+            {"$set": {"title": title, "title_status": "ready"}}
         )
+        return result.matched_count > 0
 
-        if update_result.matched_count == 0 and update_result.upserted_id is None:
-             logger.error(f"Failed to update or upsert chat document for chat_id '{chat_id}'.")
-             return False
+    except Exception as e:
+        logger.error(f"❌ 채팅 제목 저장 중 오류가 발생했습니다 (chat_id: {chat_id}): {e}")
+        return False
+
+async def aget_chat(chat_id: str) -> Optional[Dict[str, Any]]:
+    adb = get_async_db()
+    if adb is None:
+        logger.error("DB에 연결되지 않아 채팅을 조회할 수 없습니다.")
+        return None
 
-        return True
+    try:
+        return await adb.chats.find_one({"chat_id": chat_id, "deleted_at": None}, CHAT_PROJECTION)
 
     except Exception as e:
-        logger.error(f"❌ An error occurred while saving messages for chat_id '{chat_id}': {e}")
+        logger.error(f"❌ 채팅 조회 중 오류가 발생했습니다 (chat_id: {chat_id}): {e}")
         return None
 
-def get_chat_history(chat_id: str, limit: int = 10):
-    
-    if db is None:
+async def aget_chat_history(chat_id: str, limit: int = 10, include_artifacts: bool = False):
+    adb = get_async_db()
+    if adb is None:
         logger.error("DB에 연결되지 않아 기록을 조회할 수 없습니다.")
         return []
 
     try:
-        collection = db.messages
-        
-        messages_cursor = collection.find(
-            {"chat_id": chat_id}
-        ).sort("timestamp", DESCENDING).limit(limit)
+        messages_cursor = adb.messages.find(
+            {"chat_id": chat_id}, _history_projection(include_artifacts)
+        ).sort(HISTORY_SORT).limit(limit)
 
-        recent_messages = list(messages_cursor)
+        recent_messages = await messages_cursor.to_list()
         recent_messages.reverse()
 
         logger.info(f"✅ Fetched {len(recent_messages)} messages for chat_id '{chat_id}'.")
         return recent_messages
 
-
     except Exception as e:
         logger.error(f"❌ 채팅 기록 조회 중 오류가 발생했습니다: {e}")
         return []
 
-def delete_chat_history(chat_id: str): 
-    if db is None:
-        logger.error("DB에 연결되지 않아 기록을 삭제할 수 없습니다.")
-        return 0
-    
-    try:
-        messages_collection = db.messages
-        chats_collection = db.chats
+async def aget_messages_page(
+    chat_id: str, cursor: Optional[str] = None, limit: int = 20, include_artifacts: bool = True
+) -> Dict[str, Any]:
+    """
+    cursor 이전(더 오래된) 메시지를 최대 limit 개, 오래된 순서로 반환합니다.
+    Returns: {"messages": [...], "next_cursor": 다음 페이지 cursor (없으면 None)}
+    """
+    adb = get_async_db()
+    if adb is None:
+        logger.error("DB에 연결되지 않아 기록을 조회할 수 없습니다.")
+        return {"messages": [], "next_cursor": None}
 
-        delete_messages_result: DeleteResult = messages_collection.delete_many(
-            {"chat_id": chat_id}
-        )
+    limit = max(1, min(limit, MESSAGE_PAGE_MAX_LIMIT))
+    projection = {"_id": 0, **(_history_projection(include_artifacts) or {})}
+    docs = await adb.messages.find(
+        _page_query(chat_id, cursor), projection
+    ).sort(HISTORY_SORT).limit(limit + 1).to_list()
+    return _page_result(docs, limit)
 
-        delete_chat_result: DeleteResult = chats_collection.delete_one(
-            {"chat_id": chat_id}
-        )
+async def aget_chat_summary(chat_id: str) -> Optional[Dict[str, Any]]:
+    """
+    채팅의 rolling 요약, 버전, 요약에 반영된 마지막 턴의 시각(summary_until).
+    요약이 없거나 조회에 실패하면 빈 요약(version 0)을 반환합니다. 채팅이 없거나 삭제 표시되었으면 None 을 반환합니다.
+    """
+    empty = {"summary": "", "summary_version": 0, "summary_until": None}
+    adb = get_async_db()
+    if adb is None:
+        logger.error("DB에 연결되지 않아 요약을 조회할 수 없습니다.")
+        return empty
 
-        logger.info(
-            f"✅ Deletion complete for chat_id '{chat_id}': "
-            f"{delete_messages_result.deleted_count} messages and "
-            f"{delete_chat_result.deleted_count} chat room deleted."
+    try:
+        chat = await adb.chats.find_one(
+            {"chat_id": chat_id, "deleted_at": None}, {"_id": 0, "summary": 1, "summary_version": 1, "summary_until": 1}
         )
-
-        return True
-    
     except Exception as e:
-        logger.error(f"❌ 채팅 기록 삭제 중 오류가 발생했습니다: {e}")
-        return False
\ No newline at end of file
+        logger.error(f"❌ 대화 요약 조회 중 오류가 발생했습니다 (chat_id: {chat_id}): {e}")
+        return empty
+
+    if not chat:
+        return None
+    return {
+        "summary": chat.get("summary") or "",
+        "summary_version": chat.get("summary_version", 0),
+        "summary_until": chat.get("summary_until"),
+    }
+
+async def aupdate_chat_summary(chat_id: str, summary: str, expected_version: int, until: datetime) -> bool:
+    """
+    요약 버전이 expected_version 일 때만 요약을 바꾸고, watermark(summary_until)를 until 까지 올립니다.
+    다른 턴이 먼저 갱신했으면 False.
+    """
+    adb = get_async_db()
+    if adb is None:
+        logger.error("DB에 연결되지 않아 요약을 저장할 수 없습니다.")
+        return False
+
+    # summary_version 필드가 없는 이전 문서는 version 0 으로 취급합니다.
+    version_query = {"$in": [0, None]} if expected_version == 0 else expected_version
+    result: UpdateResult = await adb.chats.update_one(
+        {"chat_id": chat_id, "deleted_at": None, "summary_version": version_query},
+        {
+            "$set": {"summary": summary, "summary_updated_at": datetime.now(ZoneInfo("Asia/Seoul"))},
+            "$inc": {"summary_version": 1},
+            "$max": {"summary_until": until},
+        },
+    )
+    return result.matched_count > 0
+
+async def amark_chat_deleted(chat_id: str) -> bool:
+    """
+    채팅에 삭제 표시(deleted_at)를 남깁니다. 표시된 채팅은 조회되지 않으며, 실제 삭제는 백그라운드에서 진행합니다.
+    이미 표시된 채팅도 True 를 반환하므로, 삭제가 중간에 실패했으면 다시 요청할 수 있습니다.
+    """
+    adb = get_async_db()
+    if adb is None:
+        raise ConnectionError("DB에 연결되지 않았습니다.")
+
+    result: UpdateResult = await adb.chats.update_one(
+        {"chat_id": chat_id},
+        {"$min": {"deleted_at": datetime.now(ZoneInfo("Asia/Seoul"))}},
+    )
+    return result.matched_count > 0
+
+def _artifact_ids(message_docs: List[Dict[str, Any]]) -> Set[str]:
+    return {
+        ref["artifact_id"]
+        for doc in message_docs
+        for field in ARTIFACT_FIELDS
+        if isinstance(ref := doc.get(f"{field}_ref"), dict) and ref.get("artifact_id")
+    }
+
+async def adelete_messages_batch(chat_id: str, batch_size: int) -> Tuple[int, Set[str]]:
+    """
+    채팅 메시지를 최대 batch_size 개 삭제하고, (찾은 메시지 수, 삭제한 메시지가 참조하던 artifact id) 를 반환합니다.
+    큰 채팅도 한 번의 delete_many 로 오래 붙잡지 않도록 호출 측에서 0 이 나올 때까지 반복합니다.
+    """
+    adb = get_async_db()
+    if adb is None:
+        raise ConnectionError("DB에 연결되지 않았습니다.")
+
+    projection = {"_id": 1, **{f"{field}_ref.artifact_id": 1 for field in ARTIFACT_FIELDS}}
+    docs = await adb.messages.find({"chat_id": chat_id}, projection).limit(batch_size).to_list()
+    if not docs:
+        return 0, set()
+
+    await adb.messages.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+    return len(docs), _artifact_ids(docs)
+
+async def aartifact_referenced(artifact_id: str) -> bool:
+    """다른 메시지가 아직 artifact 를 참조하는지 확인합니다. (같은 내용은 채팅 간에 공유됩니다)"""
+    adb = get_async_db()
+    if adb is None:
+        raise ConnectionError("DB에 연결되지 않았습니다.")
+
+    doc = await adb.messages.find_one(
+        {"$or": [{f"{field}_ref.artifact_id": artifact_id} for field in ARTIFACT_FIELDS]},
+        {"_id": 1},
+    )
+    return doc is not None
+
+async def adelete_chat(chat_id: str) -> int:
+    adb = get_async_db()
+    if adb is None:
+        raise ConnectionError("DB에 연결되지 않았습니다.")
+
+    result: DeleteResult = await adb.chats.delete_one({"chat_id": chat_id})
+    return result.deleted_count
@@ -1,30 +1,83 @@
-import os
-from pymongo import MongoClient
+import asyncio
+from typing import Any, Coroutine, Optional
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
 from app.core.config import settings
+from app.core.resources import resources
 
-def get_db_client():
+def mongo_client_options(max_pool_size: int) -> dict:
+    """동기/비동기 클라이언트가 공유하는 타임아웃 설정과 클라이언트별 커넥션 풀 크기."""
+    return {
+        "maxPoolSize": max_pool_size,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    }
+
+def _connection_string() -> str:
     connection_string = settings.COSMOS_DB_CONNECTION_STRING
 
     if not connection_string:
         raise ValueError("COSMOS_DB_CONNECTION_STRING 환경 변수를 설정해주세요.")
+    return connection_string
 
-    try:
-        client = MongoClient(connection_string)
-        client.admin.command('ping')
-        print("✅ MongoDB 연결에 성공했습니다.")
-        
-        return client
+# 클라이언트 생성은 연결을 맺지 않습니다. 실제 연결은 첫 요청(또는 warmup 의 ping) 시점에 이루어집니다.
+# 요청 경로는 비동기 클라이언트를 사용합니다. 동기 클라이언트는 메시지 write-behind 워커, 인덱스 관리 등
+# 소수의 백그라운드 작업만 사용하므로 작은 풀(MONGO_SYNC_MAX_POOL_SIZE)을 따로 둡니다.
+resources.register(
+    "mongo",
+    factory=lambda: MongoClient(_connection_string(), **mongo_client_options(settings.MONGO_SYNC_MAX_POOL_SIZE)),
+    probe=lambda client: client.admin.command("ping"),
+    close=lambda client: client.close(),
+)
+
+async def _ping_async(client: AsyncMongoClient):
+    await client.admin.command("ping")
 
-    except Exception as e:
-        print(f"❌ MongoDB 연결에 실패했습니다: {e}")
-        return None
+resources.register(
+    "mongo_async",
+    factory=lambda: AsyncMongoClient(_connection_string(), **mongo_client_options(settings.MONGO_MAX_POOL_SIZE)),
+    probe=_ping_async,
+    close=lambda client: client.close(),
+)
 
-db_client = get_db_client()
+def get_db() -> Optional[Database]:
+    """동기 DB 핸들 (워커 스레드, 동기 엔드포인트용). 클라이언트를 만들 수 없으면 None."""
+    client = resources.get("mongo")
+    return client[settings.MONGO_DB_NAME] if client is not None else None
 
-def get_database(db_name):
+# 비동기 클라이언트를 사용하는 이벤트 루프. 워커 스레드의 동기 래퍼가 이 루프에서 repository 함수를 실행합니다.
+_loop: Optional[asyncio.AbstractEventLoop] = None
 
-    if db_client:
-        return db_client[db_name]
-    return None
+def bind_event_loop(loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """run_sync 가 사용할 이벤트 루프를 지정합니다. 앱 lifespan 시작 시 호출하고, 종료 시 None 으로 해제합니다."""
+    global _loop
+    _loop = loop
+
+def get_async_db() -> Optional[AsyncDatabase]:
+    """비동기 DB 핸들 (이벤트 루프에서 호출하는 repository 함수용). 클라이언트를 만들 수 없으면 None."""
+    client = resources.get("mongo_async")
+    return client[settings.MONGO_DB_NAME] if client is not None else None
+
+def run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    비동기 repository 함수를 워커 스레드(그래프 노드 등)에서 실행하고 결과를 기다립니다.
+    비동기 클라이언트는 이벤트 루프에 묶여 있으므로 그 루프에 작업을 넘깁니다. 이벤트 루프 스레드에서는 호출하지 마세요.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError("이벤트 루프 안에서는 비동기 repository 함수를 직접 await 하세요.")
 
-db = get_database("minti")
\ No newline at end of file
+    loop = _loop
+    if loop is None or not loop.is_running():
+        coro.close()
+        raise ConnectionError("비동기 DB 를 사용하는 이벤트 루프가 지정되지 않았거나 실행 중이 아닙니다. (bind_event_loop)")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
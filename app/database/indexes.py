@@ -0,0 +1,165 @@
+"""
+minti 컬렉션 인덱스 관리와 핫 쿼리 실행 계획 점검.
+
+- ensure_indexes(): 필요한 인덱스를 생성합니다. 이미 있으면 아무것도 하지 않으므로 여러 번 실행해도 됩니다.
+  인덱스별로 생성하므로, 하나가 실패해도(예: 데이터가 있는 Cosmos DB 컬렉션의 unique 인덱스) 나머지는 계속 생성합니다.
+- audit_query_plans(): 핫 쿼리의 explain 결과를 확인하고, 컬렉션 스캔(COLLSCAN)이 있으면 QueryPlanError 를 올립니다.
+
+실행:
+    python -m app.database.indexes           # 인덱스 생성 + 실행 계획 점검
+    python -m app.database.indexes --audit   # 실행 계획 점검만
+"""
+import argparse
+import logging
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+
+from .chat_history import HISTORY_SORT
+from .connection import get_db
+
+logger = logging.getLogger(__name__)
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "messages": [
+        # 대화 기록 조회(seq 역순)와 chat_id 단위 삭제
+        IndexModel([("chat_id", ASCENDING), ("seq", DESCENDING), ("timestamp", DESCENDING)], name="chat_id_seq"),
+        # seq 가 없는 이전 메시지의 timestamp 정렬
+        IndexModel([("chat_id", ASCENDING), ("timestamp", DESCENDING)], name="chat_id_timestamp"),
+        # 채팅 삭제 시 artifact 가 다른 메시지에서 쓰이는지 확인 (참조가 있는 메시지만 색인)
+        IndexModel([("graph_data_ref.artifact_id", ASCENDING)], name="graph_data_ref", sparse=True),
+        IndexModel([("plan_data_ref.artifact_id", ASCENDING)], name="plan_data_ref", sparse=True),
+    ],
+    "chats": [
+        IndexModel([("chat_id", ASCENDING)], name="chat_id_unique", unique=True),
+    ],
+    "states": [
+        IndexModel([("chat_id", ASCENDING)], name="chat_id_unique", unique=True),
+    ],
+    "plans": [
+        IndexModel([("plan_id", ASCENDING)], name="plan_id_unique", unique=True),
+    ],
+}
+
+# (이름, 컬렉션, 필터, 정렬, limit) — update/delete 는 같은 필터의 find 로 실행 계획을 확인합니다.
+HOT_QUERIES: List[Tuple[str, str, Dict[str, Any], Optional[List[Tuple[str, int]]], int]] = [
+    ("messages.history", "messages", {"chat_id": "__audit__"}, HISTORY_SORT, 10),
+    ("messages.delete_many", "messages", {"chat_id": "__audit__"}, None, 0),
+    ("messages.artifact_ref", "messages", {"$or": [{"graph_data_ref.artifact_id": "__audit__"}, {"plan_data_ref.artifact_id": "__audit__"}]}, None, 1),
+    ("states.find_one", "states", {"chat_id": "__audit__"}, None, 1),
+    ("chats.update_one", "chats", {"chat_id": "__audit__"}, None, 1),
+    ("plans.update_one", "plans", {"plan_id": "__audit__"}, None, 1),
+]
+
+
+class QueryPlanError(RuntimeError):
+    """핫 쿼리가 인덱스를 사용하지 않고 컬렉션 전체를 스캔할 때 발생합니다."""
+
+
+def _require_db(database: Optional[Database]) -> Database:
+    database = database if database is not None else get_db()
+    if database is None:
+        raise ConnectionError("DB에 연결되지 않았습니다.")
+    return database
+
+
+def ensure_indexes(database: Optional[Database] = None) -> Dict[str, List[str]]:
+    """
+    정의된 인덱스를 하나씩 생성하고, 컬렉션별로 생성(또는 확인)된 인덱스 이름을 반환합니다.
+    생성에 실패한 인덱스는 오류 로그를 남기고 건너뜁니다.
+    """
+    database = _require_db(database)
+
+    created: Dict[str, List[str]] = {}
+    failed: List[str] = []
+    for collection, models in INDEXES.items():
+        created[collection] = []
+        for model in models:
+            name = model.document["name"]
+            try:
+                created[collection] += database[collection].create_indexes([model])
+            except Exception as e:
+                failed.append(f"{collection}.{name}")
+                logger.error(f"❌ 인덱스 생성 실패: {collection}.{name}: {e}")
+        logger.info(f"✅ 인덱스 확인 완료: {collection} {created[collection]}")
+
+    if failed:
+        logger.error(f"❌ 생성하지 못한 인덱스가 있습니다: {', '.join(failed)}")
+    return created
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage", "")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def audit_query_plans(database: Optional[Database] = None) -> Dict[str, List[str]]:
+    """
+    핫 쿼리의 winning plan 단계를 반환합니다.
+    COLLSCAN 이 있으면 QueryPlanError, 메모리 정렬(SORT)이 있으면 경고 로그를 남깁니다.
+    explain 이 실패하거나 결과 형식을 알 수 없는 쿼리는 경고 로그만 남기고 건너뜁니다.
+    """
+    database = _require_db(database)
+
+    plans: Dict[str, List[str]] = {}
+    scans: List[str] = []
+    for name, collection, query, sort, limit in HOT_QUERIES:
+        cursor = database[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        try:
+            explain = cursor.explain()
+        except Exception as e:
+            logger.warning(f"⚠️ 실행 계획을 가져오지 못했습니다: {name}: {e}")
+            continue
+
+        # Cosmos DB 의 Mongo API 등은 explain 결과 형식이 다를 수 있습니다.
+        winning_plan = (explain.get("queryPlanner") or {}).get("winningPlan")
+        if not isinstance(winning_plan, dict):
+            logger.warning(f"⚠️ 알 수 없는 실행 계획 형식이라 점검하지 않습니다: {name} (keys: {sorted(explain)})")
+            continue
+
+        stages = _plan_stages(winning_plan)
+        plans[name] = stages
+
+        if "COLLSCAN" in stages:
+            scans.append(name)
+            logger.error(f"❌ 컬렉션 스캔이 발생하는 쿼리: {name} {stages}")
+        elif "SORT" in stages:
+            logger.warning(f"⚠️ 인덱스로 정렬하지 못하는 쿼리: {name} {stages}")
+        else:
+            logger.info(f"✅ {name}: {stages}")
+
+    if scans:
+        raise QueryPlanError(f"인덱스를 사용하지 않는 핫 쿼리가 있습니다: {', '.join(scans)}")
+    return plans
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="minti Mongo 인덱스 생성 및 실행 계획 점검")
+    parser.add_argument("--audit", action="store_true", help="인덱스를 만들지 않고 실행 계획만 점검합니다.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        if not args.audit:
+            ensure_indexes()
+        audit_query_plans()
+    except Exception as e:
+        logger.error(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
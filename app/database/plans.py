@@ -1,4 +1,4 @@
-from .connection import db  
+from .connection import get_db
 from pymongo.results import InsertManyResult, UpdateResult, InsertOneResult, DeleteResult
 from pymongo import DESCENDING
 import logging 
@@ -9,27 +9,30 @@ from zoneinfo import ZoneInfo
 logger = logging.getLogger(__name__)
 
 
+def _new_plan_document(plan_id: str, user_id: str, company: str, target_type: str, plan_content: dict) -> dict:
+    now = datetime.now(ZoneInfo("Asia/Seoul"))
+    return {
+        "plan_id": plan_id,
+        "user_id": user_id,
+        "title": plan_content['title'],
+        "company": company,
+        "created_at": now,
+        "last_updated": now,
+        "target_type": target_type,
+        "plan_content": plan_content,
+        "share": False,
+        "url": None
+    }
+
 def create_plan(plan_id: str, user_id: str, company: str, target_type: str, plan_content: dict):
+    db = get_db()
     if db is None:
         logger.error("DB에 연결되지 않아 메시지를 저장할 수 없습니다.")
         return None
     
     try:
         collection = db.plans
-        now = datetime.now(ZoneInfo("Asia/Seoul"))
-
-        plan_data = {
-            "plan_id": plan_id,
-            "user_id": user_id,
-            "title": plan_content['title'],
-            "company": company,
-            "created_at": now,
-            "last_updated": now,
-            "target_type": target_type,
-            "plan_content": plan_content,
-            "share": False,
-            "url": None
-        }
+        plan_data = _new_plan_document(plan_id, user_id, company, target_type, plan_content)
         
         result: InsertOneResult = collection.insert_one(plan_data)
         
@@ -46,6 +49,7 @@ def create_plan(plan_id: str, user_id: str, company: str, target_type: str, plan
         return None
 
 def save_design(plan_id: str, url: str):
+    db = get_db()
     if db is None:
         logger.error("DB에 연결되지 않아 메시지를 저장할 수 없습니다.")
         return None
@@ -68,4 +72,5 @@ def save_design(plan_id: str, url: str):
     
     except Exception as e:
         logger.error(f"Error saving design for plan '{plan_id}': {e}")
-        return False
\ No newline at end of file
+        return False
+
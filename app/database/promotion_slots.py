@@ -1,71 +1,143 @@
 from datetime import datetime
-from .connection import db  
-from pymongo.results import UpdateResult
+from .connection import get_async_db, run_sync
+from .state_cache import state_cache
+from pymongo import ReturnDocument
+from typing import Any, Callable, Dict, Optional
 import logging
 
 from app.agents.orchestrator.state import PromotionSlots
 
 logger = logging.getLogger(__name__)
 
-def get_or_create_state(chat_id: str) -> dict:
-    if db is None:
+
+class StateVersionConflict(Exception):
+    """expected_version 과 저장된 상태의 version 이 달라 업데이트하지 못했을 때 발생합니다."""
+
+
+def _new_state_document(chat_id: str) -> dict:
+    default_state = PromotionSlots()
+    new_state = default_state.model_dump(exclude_none=False)  # None 값도 포함하도록 수정
+    new_state['chat_id'] = chat_id
+    new_state['version'] = 0  # 업데이트마다 1 증가 (낙관적 동시성 제어)
+    new_state['created_at'] = datetime.now()
+    new_state['updated_at'] = datetime.now()
+    return new_state
+
+def _update_query(chat_id: str, expected_version: Optional[int]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"chat_id": chat_id}
+    if expected_version is not None:
+        # version 필드가 없는 이전 문서는 version 0 으로 취급합니다.
+        query["version"] = {"$in": [0, None]} if expected_version == 0 else expected_version
+    return query
+
+def _update_doc(new_values: dict) -> Dict[str, Any]:
+    return {"$set": dict(new_values), "$inc": {"version": 1}, "$currentDate": {"updated_at": True}}
+
+# =============================================================================
+# 비동기 repository (이벤트 루프에서 호출). 워커 스레드에서는 아래의 동기 래퍼를 사용합니다.
+# =============================================================================
+
+async def aget_or_create_state(chat_id: str) -> dict:
+    adb = get_async_db()
+    if adb is None:
         raise ConnectionError("DB에 연결되지 않았습니다.")
 
+    if (cached := state_cache.get(chat_id)) is not None:
+        return cached
+
     try:
-        collection = db.states
-        state = collection.find_one({"chat_id": chat_id})
+        collection = adb.states
+        state = await collection.find_one({"chat_id": chat_id})
 
         if state:
             logger.info(f"✅ 기존 상태를 불러왔습니다. (대화방 ID: {chat_id})")
+            state_cache.set(chat_id, state)
             return state
-        else:
-            logger.info(f"✨ 새로운 상태를 생성합니다. (대화방 ID: {chat_id})")
-
-            default_state = PromotionSlots()
-            new_state = default_state.model_dump(exclude_none=False)  # None 값도 포함하도록 수정
-            new_state['chat_id'] = chat_id
-            new_state['created_at'] = datetime.now()
-            new_state['updated_at'] = datetime.now()
-            
-            logger.info(f"새로운 상태 생성 데이터: {new_state}")  # 디버깅용 로그
-            collection.insert_one(new_state)
-            return new_state
-            
+
+        logger.info(f"✨ 새로운 상태를 생성합니다. (대화방 ID: {chat_id})")
+        new_state = _new_state_document(chat_id)
+        await collection.insert_one(new_state)
+        state_cache.set(chat_id, new_state)
+        return new_state
+
     except Exception as e:
         logger.error(f"❌ 상태 조회/생성 중 오류 발생: {e}")
         return { "chat_id": chat_id }
 
 
-def update_state(chat_id: str, new_values: dict) -> UpdateResult:
-    if db is None:
+async def aupdate_state(chat_id: str, new_values: dict, expected_version: Optional[int] = None) -> Optional[dict]:
+    """
+    상태를 find_one_and_update 한 번으로 갱신하고, 갱신된 문서를 반환합니다. (상태가 없으면 None)
+    expected_version 을 주면 저장된 version 이 같을 때만 갱신하며, 다르면 StateVersionConflict 를 올립니다.
+    """
+    adb = get_async_db()
+    if adb is None:
         raise ConnectionError("DB에 연결되지 않았습니다.")
 
     try:
-        collection = db.states
-        
-        # 기존 문서 확인
-        existing_doc = collection.find_one({"chat_id": chat_id})
-        logger.info(f"기존 문서 찾기 결과: {existing_doc}")
-        
-        set_doc = dict(new_values)
-        logger.info(f"업데이트할 데이터: {set_doc}")
-        
-        result = collection.update_one(
-            {"chat_id": chat_id},
-            {"$set": set_doc,"$currentDate": {"updated_at": True}}
+        updated_doc = await adb.states.find_one_and_update(
+            _update_query(chat_id, expected_version),
+            _update_doc(new_values),
+            return_document=ReturnDocument.AFTER,
         )
-        
-        if result.matched_count > 0:
-            logger.info(f"✅ 상태가 업데이트 되었습니다. (채팅방 ID: {chat_id}, matched: {result.matched_count}, modified: {result.modified_count})")
-            
-            # 업데이트 후 상태 확인 및 로그 출력
-            updated_doc = collection.find_one({"chat_id": chat_id})
-            logger.info(f"업데이트 후 상태: {updated_doc}")
-        else:
-            logger.warning(f"⚠️ 업데이트할 상태를 찾을 수 없습니다. (채팅방 ID: {chat_id})")
-        
-        return result
-
     except Exception as e:
         logger.error(f"❌ 상태 업데이트 중 오류 발생: {e}")
-        raise
\ No newline at end of file
+        state_cache.invalidate(chat_id)
+        raise
+
+    if updated_doc is None:
+        # 캐시가 오래되었을 수 있으므로 비워 다음 조회가 DB 를 읽도록 합니다.
+        state_cache.invalidate(chat_id)
+        if expected_version is not None:
+            raise StateVersionConflict(f"상태 버전이 일치하지 않습니다. (채팅방 ID: {chat_id}, expected: {expected_version})")
+        logger.warning(f"⚠️ 업데이트할 상태를 찾을 수 없습니다. (채팅방 ID: {chat_id})")
+        return None
+
+    logger.info(f"✅ 상태가 업데이트 되었습니다. (채팅방 ID: {chat_id}, version: {updated_doc.get('version')})")
+    logger.debug(f"업데이트 후 상태: {updated_doc}")
+    state_cache.set(chat_id, updated_doc)  # write-through
+    return updated_doc
+
+
+async def adelete_state(chat_id: str) -> int:
+    adb = get_async_db()
+    if adb is None:
+        raise ConnectionError("DB에 연결되지 않았습니다.")
+
+    result = await adb.states.delete_one({"chat_id": chat_id})
+    state_cache.invalidate(chat_id)
+    return result.deleted_count
+
+
+# =============================================================================
+# 동기 래퍼 (그래프 노드 등 워커 스레드에서 호출). 이벤트 루프에서 위의 비동기 함수를 실행합니다.
+# =============================================================================
+
+def get_or_create_state(chat_id: str) -> dict:
+    """aget_or_create_state 의 동기 래퍼. 캐시 hit 이면 이벤트 루프를 거치지 않습니다."""
+    if (cached := state_cache.get(chat_id)) is not None:
+        return cached
+    return run_sync(aget_or_create_state(chat_id))
+
+
+def update_state(chat_id: str, new_values: dict, expected_version: Optional[int] = None) -> Optional[dict]:
+    """aupdate_state 의 동기 래퍼."""
+    return run_sync(aupdate_state(chat_id, new_values, expected_version))
+
+
+def update_state_with(chat_id: str, compute_updates: Callable[[dict], dict], max_retries: int = 3) -> Optional[dict]:
+    """
+    저장된 상태를 읽어 compute_updates(state) 로 변경분을 계산하고, 그 사이 다른 턴이 상태를 바꾸지 않았을 때만 반영합니다.
+    충돌하면 최신 상태로 다시 계산합니다. 변경분이 없으면 현재 상태를 그대로 반환합니다.
+    """
+    for attempt in range(max_retries + 1):
+        current = get_or_create_state(chat_id)
+        updates = compute_updates(current)
+        if not updates:
+            return current
+        try:
+            return update_state(chat_id, updates, expected_version=current.get("version", 0))
+        except StateVersionConflict:
+            if attempt == max_retries:
+                raise
+            logger.info(f"🔁 상태 버전 충돌, 최신 상태로 다시 시도합니다. (채팅방 ID: {chat_id}, {attempt + 1}/{max_retries})")
@@ -0,0 +1,66 @@
+import logging
+import threading
+from typing import Any, Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# conn_str -> Engine. 엔진(커넥션 풀)은 프로세스에서 한 번만 만들고 text-to-SQL 호출 간에 재사용합니다.
+_engines: Dict[str, Engine] = {}
+_lock = threading.Lock()
+
+
+def get_engine(conn_str: str) -> Engine:
+    """
+    conn_str 별 공유 엔진. t2s 재시도나 tool_executor 의 병렬 t2s 호출이
+    매번 TCP/TLS/인증 핸드셰이크를 하지 않도록 풀에서 커넥션을 빌려 씁니다.
+    """
+    engine = _engines.get(conn_str)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        engine = _engines.get(conn_str)
+        if engine is None:
+            engine = create_engine(
+                conn_str,
+                pool_size=settings.SQL_POOL_SIZE,
+                max_overflow=settings.SQL_MAX_OVERFLOW,
+                pool_timeout=settings.SQL_POOL_TIMEOUT_SECONDS,
+                pool_recycle=settings.SQL_POOL_RECYCLE_SECONDS,
+                pool_pre_ping=True,
+            )
+            _engines[conn_str] = engine
+            logger.info(f"✅ SQL 엔진 생성: {engine.url.render_as_string(hide_password=True)}")
+        return engine
+
+
+def engine_stats() -> Dict[str, Dict[str, Any]]:
+    """엔진별 커넥션 풀 상태. 키는 비밀번호를 가린 접속 URL 입니다."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for engine in list(_engines.values()):
+        pool = engine.pool
+        stats[engine.url.render_as_string(hide_password=True)] = {
+            "pool_size": getattr(pool, "size", lambda: None)(),
+            "checked_in": getattr(pool, "checkedin", lambda: None)(),
+            "checked_out": getattr(pool, "checkedout", lambda: None)(),
+            "overflow": getattr(pool, "overflow", lambda: None)(),
+            "status": pool.status(),
+        }
+    return stats
+
+
+def dispose_engines() -> None:
+    """모든 엔진의 커넥션을 닫습니다. (애플리케이션 종료 시)"""
+    with _lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        try:
+            engine.dispose()
+        except Exception as e:
+            logger.warning(f"⚠️ SQL 엔진 정리 실패: {e}")
@@ -0,0 +1,10 @@
+from app.core.config import settings
+from app.utils.ttl_cache import InMemoryLRUBackend, TTLCache
+
+# chat_id -> states 문서. promotion_slots 에서 write-through, 채팅 삭제 시 무효화합니다.
+# 여러 replica 가 일관된 값을 보려면 backend 를 공유 저장소 구현으로 교체합니다.
+state_cache = TTLCache(
+    name="promotion_state",
+    backend=InMemoryLRUBackend(max_size=settings.STATE_CACHE_MAX_SIZE),
+    ttl_seconds=settings.STATE_CACHE_TTL_SECONDS,
+)
@@ -10,6 +10,7 @@ from supabase.client import ClientOptions
 from openai import OpenAI 
 
 from app.core.config import settings 
+from app.core.resources import resources
 
 logger = logging.getLogger(__name__)
 
@@ -50,31 +51,30 @@ class OpenAIEmbeddings:
 # Supabase Client
 # =============================================================================
 
-def _init_supabase_client() -> Optional["Client"]:
+def _init_supabase_client() -> "Client":
     url = settings.SUPERBASE_URL
     key = settings.SUPABASE_ANON_KEY
 
     if not url or not key:
-        logger.error("Supabase not configured: set SUPABASE_URL and SUPABASE_ANON_KEY (or SERVICE_ROLE_KEY).")
-        return None
-
-    if create_client is None:
-        raise RuntimeError(
-            "supabase package is not available. Install with `pip install supabase`."
-        )
+        raise RuntimeError("Supabase not configured: set SUPABASE_URL and SUPABASE_ANON_KEY (or SERVICE_ROLE_KEY).")
 
     return create_client(url, key, options=ClientOptions(postgrest_client_timeout=60))
 
-def _init_embeddings() -> Optional[OpenAIEmbeddings]:
-    try:
-        model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
-        return OpenAIEmbeddings(model=model)
-    except Exception as e:
-        logger.warning("Embeddings not configured: %s", e)
-        return None
+def _init_embeddings() -> OpenAIEmbeddings:
+    model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    return OpenAIEmbeddings(model=model)
+
+
+# 클라이언트는 처음 사용할 때 생성합니다. (import 시점에는 네트워크/키 검증 없음)
+resources.register("supabase", factory=_init_supabase_client)
+resources.register("embeddings", factory=_init_embeddings)
+
+
+def get_supabase_client() -> Optional["Client"]:
+    return resources.get("supabase")
 
+def get_embeddings() -> Optional[OpenAIEmbeddings]:
+    return resources.get("embeddings")
 
-supabase_client: Optional["Client"] = _init_supabase_client()
-embeddings: Optional[OpenAIEmbeddings] = _init_embeddings()
 
-__all__ = ["supabase_client", "embeddings", "OpenAIEmbeddings"]
\ No newline at end of file
+__all__ = ["get_supabase_client", "get_embeddings", "OpenAIEmbeddings"]
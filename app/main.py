@@ -7,19 +7,55 @@ import asyncio
 import logging 
 from app.core.config import settings 
 from app.core.logging_config import setup_logging
-from app.api.endpoints import chat 
+from app.api.endpoints import chat, artifacts, cache
+from app.service.message_writer import message_writer
+from app.core.resources import resources
+from app.database.connection import bind_event_loop  # mongo 리소스 등록
+import app.database.supabase  # noqa: F401  (supabase/embeddings 리소스 등록)
+from app.database.indexes import audit_query_plans, ensure_indexes
+from app.database.sql_engines import dispose_engines, engine_stats
+from app.utils.ttl_cache import cache_stats
 
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 setup_logging() 
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 워커 스레드의 동기 repository 래퍼(run_sync)가 비동기 클라이언트를 쓸 수 있도록 이 루프를 지정합니다.
+    bind_event_loop(asyncio.get_running_loop())
+
+    # import 시점에는 연결하지 않습니다. 워밍업은 여기서 명시적으로 수행하고 리소스별 소요 시간을 남깁니다.
+    if settings.RESOURCE_WARMUP_ON_STARTUP:
+        await resources.warmup()
+
+    if settings.MONGO_ENSURE_INDEXES_ON_STARTUP:
+        try:
+            await asyncio.to_thread(ensure_indexes)
+        except Exception as e:
+            logger.error(f"❌ 인덱스 생성에 실패했습니다: {e}")
+    if settings.MONGO_AUDIT_QUERY_PLANS_ON_STARTUP:
+        await asyncio.to_thread(audit_query_plans)
+
+    message_writer.start()
+    yield
+    # 종료 전에 저장 대기 중인 채팅 메시지를 모두 기록합니다.
+    await message_writer.close(timeout=settings.MESSAGE_WRITE_SHUTDOWN_TIMEOUT_SECONDS)
+    await resources.close_all()
+    await asyncio.to_thread(dispose_engines)
+    bind_event_loop(None)
+
 app = FastAPI(
     title=settings.PROJECT_NAME, 
+    lifespan=lifespan,
 )
 
 app.include_router(chat.router)
+app.include_router(artifacts.router)
+app.include_router(cache.router)
 
 async def word_stream(text: str) -> AsyncGenerator[str, None]:
     for w in text.split(): 
@@ -29,4 +65,22 @@ async def word_stream(text: str) -> AsyncGenerator[str, None]:
 
 @app.get("/healthz")
 async def healthz():
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
+
+@app.get("/readyz")
+async def readyz():
+    """초기화된 리소스의 probe 결과. 실패한 리소스가 있으면 503 을 반환합니다."""
+    report = await resources.health()
+    ready = all(item["ok"] for item in report.values())
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"ready": ready, "resources": report},
+    )
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    return cache_stats()
+
+@app.get("/metrics/sql-pool")
+async def sql_pool_metrics():
+    return engine_stats()
\ No newline at end of file
@@ -1,8 +1,9 @@
 from typing import Optional, AsyncGenerator
 from app.core.config import settings
+from app.schema.stream import StreamEvent
 from .chat import  mock_suggestion
 
-def get_mock_response(message: str, chat_id: str = None) -> Optional[AsyncGenerator[str, None]]:
+def get_mock_response(message: str, chat_id: str = None) -> Optional[AsyncGenerator[StreamEvent, None]]:
     """
     테스트 메시지면 mock 응답 반환, 아니면 None
     
@@ -32,7 +33,7 @@ def get_mock_response(message: str, chat_id: str = None) -> Optional[AsyncGenera
     
     return None
 
-async def mock_stream_with_save(chat_id: str, user_message: str, mock_stream: AsyncGenerator[str, None]):
+async def mock_stream_with_save(chat_id: str, user_message: str, mock_stream: AsyncGenerator[StreamEvent, None]):
     """
     Mock 응답을 스트리밍하면서 채팅 히스토리에 저장
     
@@ -41,27 +42,21 @@ async def mock_stream_with_save(chat_id: str, user_message: str, mock_stream: As
         user_message: 사용자 메시지
         mock_stream: Mock 응답 스트림
     """
-    from app.database.chat_history import save_chat_message
-    import json
+    from app.service.message_writer import message_writer
     
     full_response_content = []
     
-    async for chunk_str in mock_stream:
-        yield chunk_str
+    async for event in mock_stream:
+        yield event
         
         # 응답 내용 수집
-        if chunk_str.startswith('data: '):
-            try:
-                data = json.loads(chunk_str[6:])
-                if data.get('type') == 'chunk' and data.get('content'):
-                    full_response_content.append(data['content'])
-            except (json.JSONDecodeError, KeyError):
-                continue
+        if event.type == "chunk" and event.content:
+            full_response_content.append(event.content)
     
     # 채팅 히스토리에 저장
     final_agent_message = "".join(full_response_content)
     if final_agent_message:
-        save_chat_message(
+        await message_writer.enqueue(
             chat_id=chat_id,
             user_message=user_message,
             agent_message=final_agent_message,
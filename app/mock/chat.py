@@ -1,8 +1,12 @@
-import json
 import asyncio
+import logging
 from typing import AsyncGenerator
 
-async def mock_suggestion() -> AsyncGenerator[str, None]:
+from app.schema.stream import StreamEvent
+
+logger = logging.getLogger(__name__)
+
+async def mock_suggestion() -> AsyncGenerator[StreamEvent, None]:
 
   """[테스트용] 최종 확인에 대한 mock 응답"""
   message = '''
@@ -10,7 +14,7 @@ async def mock_suggestion() -> AsyncGenerator[str, None]:
 최종 확인 테스트입니다. 프로모션 계획이 완성되었습니다. 다음 단계로 진행하시겠습니까?
 '''
   payload = {"type": "start"}
-  yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+  yield StreamEvent(**payload)
   
   # 스트리밍 형태로 응답
   for char in message:
@@ -18,11 +22,11 @@ async def mock_suggestion() -> AsyncGenerator[str, None]:
           "type": "chunk",
           "content": char
       }
-      yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+      yield StreamEvent(**payload)
       await asyncio.sleep(0.02)  # 타이핑 효과
 
   payload = {"type": "table_start"}
-  yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+  yield StreamEvent(**payload)
 
   Table = '''
 | product_id | product_name | brand | category_l1 | category_l2 | total_purchase_count |
@@ -39,11 +43,11 @@ async def mock_suggestion() -> AsyncGenerator[str, None]:
           "type": "chunk",
           "content": char
       }
-      yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+      yield StreamEvent(**payload)
       await asyncio.sleep(0.02)  # 타이핑 효과
 
   payload = {"type": "table_end"}
-  yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+  yield StreamEvent(**payload)
 
   simple_graph = {
     "data": [
@@ -80,32 +84,30 @@ async def mock_suggestion() -> AsyncGenerator[str, None]:
   }
   
   payload = {'type': "graph", "content": simple_graph}
-  yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+  yield StreamEvent(**payload)
   
   payload = {"type": "plan", "content": "brand"}
-  yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+  yield StreamEvent(**payload)
 
     # 완료 신호
   payload = {"type": "done"}
-  yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+  yield StreamEvent(**payload)
 
 
-async def mock_brand_test(chat_id: str) -> AsyncGenerator[str, None]:
+async def mock_brand_test(chat_id: str) -> AsyncGenerator[StreamEvent, None]:
     """[테스트] brand에 대한 mock 응답"""
-    from app.database.promotion_slots import update_state
-    import asyncio
+    from app.database.promotion_slots import aget_or_create_state, aupdate_state
     
     # chat_id가 제공된 경우 slot 업데이트
     if chat_id:
         try:
-            from app.database.promotion_slots import get_or_create_state
             # 먼저 state가 존재하는지 확인하고 없으면 생성
-            get_or_create_state(chat_id)
+            await aget_or_create_state(chat_id)
             # 그 다음 업데이트
-            result = update_state(chat_id, {"target_type": "brand"})
-            print(f"Updated slot for chat_id {chat_id}: matched_count={result.matched_count}")
+            result = await aupdate_state(chat_id, {"target_type": "brand"})
+            logger.info(f"✅ Updated slot for chat_id {chat_id}: version={result.get('version') if result else None}")
         except Exception as e:
-            print(f"Error updating slot for chat_id {chat_id}: {e}")
+            logger.error(f"❌ Error updating slot for chat_id {chat_id}: {e}")
     
     # 응답 메시지
     message = '''
@@ -114,7 +116,7 @@ target_type: brand
 '''
     
     payload = {"type": "start"}
-    yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    yield StreamEvent(**payload)
     
     # 스트리밍 형태로 응답
     for char in message:
@@ -122,34 +124,32 @@ target_type: brand
             "type": "chunk",
             "content": char
         }
-        yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        yield StreamEvent(**payload)
         await asyncio.sleep(0.02)  # 타이핑 효과
     
     # plan 타입 데이터 전송
     payload = {"type": "plan", "content": "brand"}
-    yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    yield StreamEvent(**payload)
     
     # 완료 신호
     payload = {"type": "done"}
-    yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    yield StreamEvent(**payload)
 
 
-async def mock_category_test(chat_id: str) -> AsyncGenerator[str, None]:
+async def mock_category_test(chat_id: str) -> AsyncGenerator[StreamEvent, None]:
     """[테스트] category에 대한 mock 응답"""
-    from app.database.promotion_slots import update_state
-    import asyncio
+    from app.database.promotion_slots import aget_or_create_state, aupdate_state
     
     # chat_id가 제공된 경우 slot 업데이트
     if chat_id:
         try:
-            from app.database.promotion_slots import get_or_create_state
             # 먼저 state가 존재하는지 확인하고 없으면 생성
-            get_or_create_state(chat_id)
+            await aget_or_create_state(chat_id)
             # 그 다음 업데이트
-            result = update_state(chat_id, {"target_type": "category"})
-            print(f"Updated slot for chat_id {chat_id}: matched_count={result.matched_count}")
+            result = await aupdate_state(chat_id, {"target_type": "category"})
+            logger.info(f"✅ Updated slot for chat_id {chat_id}: version={result.get('version') if result else None}")
         except Exception as e:
-            print(f"Error updating slot for chat_id {chat_id}: {e}")
+            logger.error(f"❌ Error updating slot for chat_id {chat_id}: {e}")
     
     # 응답 메시지
     message = '''
@@ -158,7 +158,7 @@ target_type: category
 '''
     
     payload = {"type": "start"}
-    yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    yield StreamEvent(**payload)
     
     # 스트리밍 형태로 응답
     for char in message:
@@ -166,13 +166,13 @@ target_type: category
             "type": "chunk",
             "content": char
         }
-        yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        yield StreamEvent(**payload)
         await asyncio.sleep(0.02)  # 타이핑 효과
     
     # plan 타입 데이터 전송
     payload = {"type": "plan", "content": "category"}
-    yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    yield StreamEvent(**payload)
     
     # 완료 신호
     payload = {"type": "done"}
-    yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
\ No newline at end of file
+    yield StreamEvent(**payload)
\ No newline at end of file
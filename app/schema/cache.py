@@ -0,0 +1,5 @@
+from ._base import CamelCaseModel
+from typing import List, Optional
+
+class InvalidateSqlResultsRequest(CamelCaseModel):
+    tables: Optional[List[str]] = None  # 비우면 전체 무효화
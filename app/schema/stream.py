@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Literal, Optional
+
+StreamEventType = Literal[
+    "start",        # 스트림 시작
+    "state",        # 진행 상태 메시지
+    "chunk",        # 응답 텍스트
+    "table_start",  # 마크다운 표 시작
+    "table_end",    # 마크다운 표 끝
+    "graph",        # Plotly 그래프 JSON
+    "download",     # CSV 다운로드 링크
+    "plan",         # 기획서 타입 (brand / category)
+    "error",
+    "done",         # 스트림 종료
+]
+
+class StreamEvent(BaseModel):
+    """
+    stream_agent 가 내보내는 이벤트.
+    SSE 직렬화는 app.utils.sse.encode_sse 에서 한 번만 수행하고,
+    저장 로직(stream_and_save_wrapper 등)은 이 객체에서 바로 값을 읽습니다.
+    """
+    type: StreamEventType
+    content: Any = None
+    message: Optional[str] = None
+
+    def to_payload(self) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"type": self.type}
+        if self.content is not None:
+            payload["content"] = self.content
+        if self.message is not None:
+            payload["message"] = self.message
+        return payload
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import Set
+
+from app.core.config import settings
+from app.database.chat_history import aartifact_referenced, adelete_chat, adelete_messages_batch
+from app.database.promotion_slots import adelete_state
+from app.service.message_writer import message_writer
+from app.service.stream_registry import stream_registry
+from app.utils.artifact_store import get_artifact_store
+
+logger = logging.getLogger(__name__)
+
+
+async def _delete_unreferenced_artifacts(artifact_ids: Set[str]) -> int:
+    store = get_artifact_store()
+    if store is None:
+        return 0
+
+    deleted = 0
+    for artifact_id in artifact_ids:
+        try:
+            if await aartifact_referenced(artifact_id):
+                continue
+            await asyncio.to_thread(store.delete, artifact_id)
+            deleted += 1
+        except Exception as e:
+            logger.warning(f"⚠️ artifact 삭제 실패 (artifact_id: {artifact_id}): {e}")
+    return deleted
+
+
+async def delete_chat_cascade(chat_id: str, batch_size: int = settings.CHAT_DELETE_BATCH_SIZE) -> None:
+    """
+    삭제 표시된 채팅의 데이터를 모두 지웁니다. (DELETE /chat/{chat_id} 의 백그라운드 작업)
+
+    실행 중인 스트림과 재전송 버퍼 -> 저장 대기 중인 턴 -> 메시지(배치) -> 참조가 남지 않은 artifact -> 상태(+캐시) -> 채팅 문서 순서입니다.
+    삭제 표시 이후의 턴은 저장되지 않으므로(insert_message_batch), 메시지를 지우기 전에 이미 저장 중인 턴만 기다리면 됩니다.
+    채팅 문서를 마지막에 지우므로, 중간에 실패하면 같은 요청을 다시 보내 이어서 삭제할 수 있습니다.
+    """
+    try:
+        await stream_registry.discard(chat_id)
+        await message_writer.discard(chat_id, timeout=settings.MESSAGE_WRITE_SHUTDOWN_TIMEOUT_SECONDS)
+
+        message_count = 0
+        artifact_ids: Set[str] = set()
+        while True:
+            found, referenced = await adelete_messages_batch(chat_id, batch_size)
+            message_count += found
+            artifact_ids |= referenced
+            if found < batch_size:
+                break
+
+        artifact_count = await _delete_unreferenced_artifacts(artifact_ids)
+        state_count = await adelete_state(chat_id)
+        chat_count = await adelete_chat(chat_id)
+
+        logger.info(
+            f"✅ 채팅 삭제 완료 (chat_id: {chat_id}): 메시지 {message_count}개, artifact {artifact_count}개, "
+            f"상태 {state_count}개, 채팅 {chat_count}개"
+        )
+
+    except Exception as e:
+        logger.error(f"❌ 채팅 삭제 중 오류가 발생했습니다 (chat_id: {chat_id}): {e}", exc_info=True)
@@ -1,57 +1,74 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 
-import json 
+from contextlib import aclosing
+from functools import lru_cache
+from typing import AsyncGenerator
 
 from app.core.config import settings
-from app.database.chat_history import save_chat_message
+from app.database.chat_history import PROVISIONAL_CHAT_TITLE, aupdate_chat_title
+from app.service.conversation_summary import schedule_summary_update
+from app.service.llm_lane import background_llm_lane
+from app.service.message_writer import message_writer
+from app.schema.stream import StreamEvent
+
+@lru_cache(maxsize=1)
+def _title_chain():
+    """제목 생성 체인. LLM 클라이언트를 요청마다 새로 만들지 않도록 한 번만 생성합니다."""
+    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0, api_key=settings.GOOGLE_API_KEY, max_retries=3)
+    prompt = ChatPromptTemplate.from_template(
+        "사용자의 첫 번째 메시지를 바탕으로, 대화의 주제를 잘 나타내는 간결한 한글 제목을 5단어 이내로 생성해줘. 제목만 따옴표 없이 반환해. 메시지: '{message}'"
+    )
+    return prompt | llm
 
 async def generate_chat_title(message: str) -> str:
     try:
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0, api_key=settings.GOOGLE_API_KEY, max_retries=3)
-        prompt = ChatPromptTemplate.from_template(
-            "사용자의 첫 번째 메시지를 바탕으로, 대화의 주제를 잘 나타내는 간결한 한글 제목을 5단어 이내로 생성해줘. 제목만 따옴표 없이 반환해. 메시지: '{message}'"
-        )
-        chain = prompt | llm
-        title_response = await chain.ainvoke({"message": message})
+        title_response = await _title_chain().ainvoke({"message": message})
         title = title_response.content.strip().replace('"', '')
-        return title if title else "새로운 대화"
+        return title if title else PROVISIONAL_CHAT_TITLE
         
     except Exception as e:
         print(f"Error generating chat title: {e}")
-        return "새로운 대화"
+        return PROVISIONAL_CHAT_TITLE
+
+async def generate_and_save_chat_title(chat_id: str, message: str):
+    """백그라운드 작업: 저우선순위 LLM 구간에서 제목을 생성해 채팅 문서에 반영합니다."""
+    async with background_llm_lane.slot():
+        title = await generate_chat_title(message)
+    await aupdate_chat_title(chat_id, title)
 
 
-async def stream_and_save_wrapper(chat_id: str, user_message: str, response_stream):
+async def stream_and_save_wrapper(
+    chat_id: str, user_message: str, response_stream: AsyncGenerator[StreamEvent, None]
+) -> AsyncGenerator[StreamEvent, None]:
     print("stream_and_save_wrapper")
     full_response_content = []
     graph_data = None
     plan_data = None
 
-    async for chunk_str in response_stream:
-        yield chunk_str 
-        
-        if chunk_str.startswith('data: '):
-            try:
-                data = json.loads(chunk_str[6:])
-                if data.get('type') == 'chunk' and data.get('content'):
-                    full_response_content.append(data['content'])
-                elif data.get('type') == "graph": 
-                    graph_data = data.get("content")
-                elif data.get("type") == "plan": 
-                    plan_data = data.get("content")
-            except (json.JSONDecodeError, KeyError):
-                continue 
+    # 스트림이 중간에 닫히면(클라이언트 연결 종료) 하위 stream_agent 도 함께 닫아 실행을 취소합니다.
+    async with aclosing(response_stream):
+        async for event in response_stream:
+            yield event
+
+            # SSE 문자열을 다시 파싱하지 않고 이벤트 객체에서 바로 수집합니다.
+            if event.type == "chunk" and event.content:
+                full_response_content.append(event.content)
+            elif event.type == "graph":
+                graph_data = event.content
+            elif event.type == "plan":
+                plan_data = event.content
 
     final_agent_message = "".join(full_response_content)
     print("graph_data: ", graph_data)
 
     if final_agent_message:
         print("saving chat message ...")
-        save_chat_message(
+        turn_at = await message_writer.enqueue(
             chat_id=chat_id, 
             user_message=user_message,
             agent_message=final_agent_message,
             graph_data=graph_data,
             plan_data=plan_data
         )
+        schedule_summary_update(chat_id, user_message, final_agent_message, turn_at)
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Set
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from app.core.config import settings
+from app.database.chat_history import aget_chat_summary, aupdate_chat_summary
+from app.service.llm_lane import background_llm_lane
+
+logger = logging.getLogger(__name__)
+
+# 실행 중인 요약 작업 (완료 전에 GC 되지 않도록 참조를 보관)
+_pending: Set[asyncio.Task] = set()
+
+
+@lru_cache(maxsize=1)
+def _summary_chain():
+    """요약 체인. LLM 클라이언트를 턴마다 새로 만들지 않도록 한 번만 생성합니다."""
+    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0, api_key=settings.GOOGLE_API_KEY, max_retries=3)
+    prompt = ChatPromptTemplate.from_template(
+        "너는 마케팅 어시스턴트 대화의 요약을 관리한다. 기존 요약에 새 턴을 반영해 갱신된 요약만 한국어로 반환해.\n"
+        "- 사용자가 정한 프로모션 조건(대상, 브랜드/제품, 목표, 기간, 트렌드 반영 여부)과 결정 사항은 빠짐없이 유지해.\n"
+        "- 조회한 데이터의 핵심 수치와 결론만 남기고, 표/차트/기획서 원문은 옮기지 마.\n"
+        "- {max_chars}자 이내.\n\n"
+        "[기존 요약]\n{summary}\n\n[새 턴]\n사용자: {user_message}\n어시스턴트: {agent_message}"
+    )
+    return prompt | llm
+
+
+def _clip(text: str) -> str:
+    limit = settings.CHAT_SUMMARY_INPUT_MAX_CHARS
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+async def update_conversation_summary(
+    chat_id: str, user_message: str, agent_message: str, turn_at: datetime, max_retries: int = 2
+):
+    """
+    직전 턴을 채팅의 rolling 요약에 반영합니다. (저우선순위 LLM 구간에서 실행)
+    turn_at(턴 메시지의 시각)을 요약의 watermark 로 저장해, 다음 턴부터 이 턴의 원문은 LLM 에 다시 보내지 않습니다.
+    같은 채팅의 다른 턴이 먼저 요약을 갱신했으면 최신 요약으로 다시 계산합니다.
+    """
+    async with background_llm_lane.slot():
+        for attempt in range(max_retries + 1):
+            current = await aget_chat_summary(chat_id)
+            if current is None:
+                # 채팅이 없거나 삭제 중이면 버전 충돌이 아니므로 LLM 을 호출하지 않습니다.
+                logger.info(f"ℹ️ 채팅이 없어 대화 요약을 건너뜁니다. (chat_id: {chat_id})")
+                return
+            try:
+                response = await _summary_chain().ainvoke({
+                    "summary": current["summary"] or "(없음)",
+                    "user_message": _clip(user_message),
+                    "agent_message": _clip(agent_message),
+                    "max_chars": settings.CHAT_SUMMARY_MAX_CHARS,
+                })
+            except Exception as e:
+                logger.warning(f"⚠️ 대화 요약 생성 실패 (chat_id: {chat_id}): {e}")
+                return
+
+            summary = response.content.strip()[:settings.CHAT_SUMMARY_MAX_CHARS]
+            if not summary:
+                return
+            if await aupdate_chat_summary(chat_id, summary, current["summary_version"], turn_at):
+                logger.info(f"✅ 대화 요약 갱신 (chat_id: {chat_id}, {len(summary)}자)")
+                return
+            logger.info(f"🔁 대화 요약 버전 충돌, 다시 시도합니다. (chat_id: {chat_id}, {attempt + 1}/{max_retries})")
+
+
+def schedule_summary_update(chat_id: str, user_message: str, agent_message: str, turn_at: datetime) -> None:
+    """턴 응답을 지연시키지 않도록 요약 갱신을 백그라운드 작업으로 실행합니다."""
+    if not settings.CHAT_SUMMARY_ENABLED:
+        return
+    task = asyncio.create_task(update_conversation_summary(chat_id, user_message, agent_message, turn_at))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
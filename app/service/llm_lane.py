@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LowPriorityLane:
+    """
+    백그라운드 LLM 호출(채팅 제목 생성 등)용 저우선순위 실행 구간.
+
+    - 동시에 max_concurrency 개까지만 실행합니다.
+    - 실행 중인 대화형 스트림이 busy_threshold 개 이상이면 잠시 양보하고,
+      max_defer_seconds 가 지나면 더 기다리지 않고 실행합니다.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        interactive_load: Callable[[], int],
+        busy_threshold: int,
+        max_defer_seconds: float,
+        poll_seconds: float = 0.5,
+    ):
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._interactive_load = interactive_load
+        self.busy_threshold = busy_threshold
+        self.max_defer_seconds = max_defer_seconds
+        self.poll_seconds = poll_seconds
+
+    @asynccontextmanager
+    async def slot(self):
+        deadline = time.monotonic() + self.max_defer_seconds
+        while self._interactive_load() >= self.busy_threshold and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_seconds)
+
+        async with self._semaphore:
+            yield
+
+
+def _interactive_streams() -> int:
+    from app.service.stream_registry import stream_registry
+    return stream_registry.active_count()
+
+
+background_llm_lane = LowPriorityLane(
+    max_concurrency=settings.BACKGROUND_LLM_CONCURRENCY,
+    interactive_load=_interactive_streams,
+    busy_threshold=settings.BACKGROUND_LLM_BUSY_STREAMS,
+    max_defer_seconds=settings.BACKGROUND_LLM_MAX_DEFER_SECONDS,
+)
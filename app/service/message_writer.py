@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.database.chat_history import build_message_documents, insert_message_batch
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriteQueue:
+    """
+    채팅 메시지 write-behind 큐.
+
+    - enqueue() 는 문서를 만들어 큐에 넣기만 하고 바로 반환합니다. (큐가 가득 차면 빈자리가 날 때까지 대기)
+    - 워커 태스크가 큐에 쌓인 여러 채팅의 턴을 batch_size 까지 모아 스레드에서 한 번에 저장합니다.
+      pymongo 호출이 이벤트 루프 스레드에서 실행되지 않습니다.
+    - 저장에 실패하면 지수 백오프로 max_retries 번까지 재시도합니다.
+    - close() 는 남은 메시지를 모두 저장할 때까지 기다립니다. (앱 종료 시 호출)
+    - discard() 는 채팅의 대기 중인 턴을 버리고, 이미 저장 중인 배치가 끝날 때까지 기다립니다. (채팅 삭제 시 호출)
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], None],
+        max_size: int,
+        batch_size: int,
+        linger_ms: int,
+        max_retries: int,
+        retry_backoff_seconds: float,
+    ):
+        self._write_batch = write_batch
+        self.max_size = max_size
+        self.batch_size = max(1, batch_size)
+        self.linger = max(0, linger_ms) / 1000
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: Dict[str, int] = {}  # chat_id -> 큐에 있거나 저장 중인 턴 수
+        self._discarded: Set[str] = set()
+        self._settled = asyncio.Condition()
+
+    def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def enqueue(self, chat_id: str, user_message: str, agent_message: str, graph_data=None, plan_data: Optional[str] = None):
+        """턴의 메시지 문서를 큐에 넣고, 메시지 시각(timestamp)을 반환합니다."""
+        self.start()
+        docs = build_message_documents(chat_id, user_message, agent_message, graph_data, plan_data)
+        self._pending[chat_id] = self._pending.get(chat_id, 0) + 1
+        try:
+            await self._queue.put(docs)
+        except BaseException:
+            await self._settle([docs])
+            raise
+        return docs[0]["timestamp"]
+
+    async def _settle(self, batch: List[List[Dict[str, Any]]]):
+        async with self._settled:
+            for docs in batch:
+                chat_id = docs[0]["chat_id"]
+                remaining = self._pending.get(chat_id, 0) - 1
+                if remaining > 0:
+                    self._pending[chat_id] = remaining
+                else:
+                    self._pending.pop(chat_id, None)
+                    self._discarded.discard(chat_id)
+            self._settled.notify_all()
+
+    async def discard(self, chat_id: str, timeout: Optional[float] = None):
+        """
+        채팅의 대기 중인 턴을 저장하지 않도록 표시하고, 이미 저장 중인 배치가 끝날 때까지 기다립니다.
+        이후 들어오는 턴은 채팅 문서의 삭제 표시 때문에 저장되지 않습니다.
+        """
+        if chat_id not in self._pending:
+            return
+        self._discarded.add(chat_id)
+        try:
+            async with self._settled:
+                await asyncio.wait_for(self._settled.wait_for(lambda: chat_id not in self._pending), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ 저장 중인 메시지가 시간 내에 끝나지 않았습니다. (chat_id: {chat_id})")
+
+    async def _next_batch(self) -> List[List[Dict[str, Any]]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.linger
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                docs = [doc for turn in batch for doc in turn if doc["chat_id"] not in self._discarded]
+                if docs:
+                    await self._write(docs)
+            finally:
+                await self._settle(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, docs: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await asyncio.to_thread(self._write_batch, docs)
+                logger.debug(f"💾 메시지 {len(docs)}개를 저장했습니다.")
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    chat_ids = sorted({doc["chat_id"] for doc in docs})
+                    logger.error(f"❌ 메시지 저장에 최종 실패했습니다 (chat_ids: {chat_ids}): {e}", exc_info=True)
+                    return
+                delay = self.retry_backoff_seconds * (2 ** attempt)
+                logger.warning(f"⚠️ 메시지 저장 실패, {delay:.1f}초 후 재시도합니다 ({attempt + 1}/{self.max_retries}): {e}")
+                await asyncio.sleep(delay)
+
+    async def close(self, timeout: Optional[float] = None):
+        """남은 메시지를 저장하고 워커를 종료합니다."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"❌ 종료 시간 내에 저장하지 못한 메시지 턴이 {self._queue.qsize()}개 있습니다.")
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+
+message_writer = MessageWriteQueue(
+    write_batch=insert_message_batch,
+    max_size=settings.MESSAGE_WRITE_QUEUE_SIZE,
+    batch_size=settings.MESSAGE_WRITE_BATCH_SIZE,
+    linger_ms=settings.MESSAGE_WRITE_LINGER_MS,
+    max_retries=settings.MESSAGE_WRITE_MAX_RETRIES,
+    retry_backoff_seconds=settings.MESSAGE_WRITE_RETRY_BACKOFF_SECONDS,
+)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+from typing import AsyncGenerator, AsyncIterator, Optional, Set
+
+from fastapi import Request
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+_IDLE = object()
+
+# asyncio 는 태스크를 약한 참조로만 들고 있으므로, 실행 중인 producer 를 여기서 붙잡아 둡니다.
+_producers: Set[asyncio.Task] = set()
+
+
+async def stream_until_disconnect(
+    request: Request,
+    source: AsyncGenerator[str, None],
+    *,
+    max_buffered: Optional[int] = None,
+    poll_interval: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """
+    오케스트레이터 스트림(producer)과 StreamingResponse(consumer) 사이의 bounded bridge.
+
+    - producer 는 별도 태스크에서 source 를 읽어 크기가 제한된 큐에 넣습니다.
+      클라이언트가 느리게 읽어 큐가 가득 차면 producer 가 멈춰, 프레임이 메모리에 쌓이지 않습니다.
+    - consumer 는 큐를 기다리는 동안 주기적으로 연결 상태를 확인합니다.
+      연결이 끊기거나 응답 태스크가 취소되면 producer 를 취소하고 source 를 닫습니다.
+      source 가 StreamSession 구독이면 세션이 재연결 대기(grace) 후 그래프 실행을 취소합니다.
+
+    Args:
+        request: 연결 상태를 확인할 요청 객체
+        source: SSE 프레임을 생성하는 async generator
+        max_buffered: 큐에 보관할 최대 프레임 수 (기본값: settings.STREAM_MAX_BUFFERED_FRAMES)
+        poll_interval: 연결 상태 확인 주기(초) (기본값: settings.STREAM_DISCONNECT_POLL_SECONDS)
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered or settings.STREAM_MAX_BUFFERED_FRAMES)
+    poll_interval = poll_interval or settings.STREAM_DISCONNECT_POLL_SECONDS
+
+    async def produce():
+        try:
+            async for frame in source:
+                await queue.put(frame)  # 큐가 가득 차면 consumer 가 읽을 때까지 대기 (backpressure)
+        except Exception as e:
+            logger.error(f"❌ 스트림 생성 중 오류가 발생했습니다: {e}", exc_info=True)
+        finally:
+            # 취소된 경우에도 source 를 닫아 하위 generator 의 정리 로직이 실행되도록 합니다.
+            await source.aclose()
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    _producers.add(producer)
+    producer.add_done_callback(_producers.discard)
+
+    try:
+        last_check = time.monotonic()
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                frame = _IDLE
+
+            # 프레임이 계속 들어오는 중에도 poll_interval 마다 연결 상태를 확인합니다.
+            now = time.monotonic()
+            if now - last_check >= poll_interval:
+                last_check = now
+                if await request.is_disconnected():
+                    logger.info("🔌 클라이언트 연결이 끊겨 스트림을 중단합니다.")
+                    break
+
+            if frame is _IDLE:
+                continue
+            if frame is _END:
+                break
+            yield frame
+
+    finally:
+        if not producer.done():
+            producer.cancel()
@@ -0,0 +1,391 @@
+import asyncio
+import logging
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import AsyncGenerator, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.schema.stream import StreamEvent
+from app.utils.sse import to_sse
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Replay Backend
+# =============================================================================
+
+class ReplayBackend(ABC):
+    """
+    채팅별 SSE 이벤트 재전송 버퍼 저장소 인터페이스.
+
+    - append(): 프레임(id 없는 SSE 텍스트)에 채팅별로 단조 증가하는 이벤트 id 를 부여하고 저장합니다.
+    - read_after(): last_event_id 이후의 프레임을 (id, frame) 목록으로 반환합니다.
+      용량 제한으로 앞쪽 프레임이 제거되었으면 첫 id 가 last_event_id + 1 보다 큽니다.
+    - expire(): last_event_id 이후 새 프레임이 없으면 버퍼를 지웁니다. (실행 종료 후 재연결 대기 시간이 지났을 때)
+    여러 replica 가 같은 버퍼를 보려면 Redis 등 공유 저장소로 이 인터페이스를 구현합니다.
+    """
+
+    @abstractmethod
+    async def append(self, chat_id: str, frame: str) -> int:
+        ...
+
+    @abstractmethod
+    async def read_after(self, chat_id: str, last_event_id: int) -> List[Tuple[int, str]]:
+        ...
+
+    @abstractmethod
+    async def expire(self, chat_id: str, last_event_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def discard(self, chat_id: str) -> None:
+        ...
+
+
+def _frame_size(frame: str) -> int:
+    return sys.getsizeof(frame)
+
+
+def _initial_event_id() -> int:
+    """
+    버퍼를 새로 만들 때의 시작 id. 버퍼가 만료/제거된 뒤 다시 만들어져도 이전 턴의 id 보다 커지도록 시각(ms)을 씁니다.
+    (재연결한 클라이언트의 오래된 Last-Event-ID 가 새 턴의 프레임을 건너뛰지 않도록)
+    """
+    return int(time.time() * 1000)
+
+
+class _ChatBuffer:
+    def __init__(self):
+        self.frames: Deque[Tuple[int, str]] = deque()
+        self.bytes = 0
+        self.last_id = _initial_event_id()
+
+
+class InMemoryReplayBackend(ReplayBackend):
+    """
+    프로세스 내 ring buffer.
+    채팅별로 최대 buffer_size 프레임 / max_bytes_per_chat 바이트, 전체 max_chats 채팅 / max_total_bytes 바이트(LRU)만 보관합니다.
+    가장 최근 프레임은 크기와 관계없이 남깁니다.
+    """
+
+    def __init__(self, buffer_size: int, max_chats: int, max_bytes_per_chat: int, max_total_bytes: int):
+        self.buffer_size = buffer_size
+        self.max_chats = max_chats
+        self.max_bytes_per_chat = max_bytes_per_chat
+        self.max_total_bytes = max_total_bytes
+        self._buffers: "OrderedDict[str, _ChatBuffer]" = OrderedDict()
+        self._total_bytes = 0
+
+    def _buffer(self, chat_id: str) -> _ChatBuffer:
+        buffer = self._buffers.get(chat_id)
+        if buffer is None:
+            buffer = self._buffers[chat_id] = _ChatBuffer()
+        else:
+            self._buffers.move_to_end(chat_id)
+        return buffer
+
+    def _pop(self, chat_id: str) -> None:
+        buffer = self._buffers.pop(chat_id, None)
+        if buffer is not None:
+            self._total_bytes -= buffer.bytes
+
+    def _trim(self, buffer: _ChatBuffer) -> None:
+        while len(buffer.frames) > 1 and (
+            len(buffer.frames) > self.buffer_size or buffer.bytes > self.max_bytes_per_chat
+        ):
+            _, frame = buffer.frames.popleft()
+            size = _frame_size(frame)
+            buffer.bytes -= size
+            self._total_bytes -= size
+
+    def _evict(self, keep: str) -> None:
+        """채팅 수/전체 크기 제한을 넘으면 가장 오래 사용하지 않은 채팅의 버퍼부터 지웁니다."""
+        while len(self._buffers) > 1 and (
+            len(self._buffers) > self.max_chats or self._total_bytes > self.max_total_bytes
+        ):
+            oldest = next(iter(self._buffers))
+            if oldest == keep:
+                break
+            self._pop(oldest)
+
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    async def append(self, chat_id: str, frame: str) -> int:
+        buffer = self._buffer(chat_id)
+        buffer.last_id += 1
+        size = _frame_size(frame)
+        buffer.frames.append((buffer.last_id, frame))
+        buffer.bytes += size
+        self._total_bytes += size
+        self._trim(buffer)
+        self._evict(keep=chat_id)
+        return buffer.last_id
+
+    async def read_after(self, chat_id: str, last_event_id: int) -> List[Tuple[int, str]]:
+        buffer = self._buffers.get(chat_id)
+        if buffer is None:
+            return []
+        return [(i, f) for i, f in buffer.frames if i > last_event_id]
+
+    async def expire(self, chat_id: str, last_event_id: int) -> None:
+        buffer = self._buffers.get(chat_id)
+        if buffer is not None and buffer.last_id == last_event_id:
+            self._pop(chat_id)
+
+    async def discard(self, chat_id: str) -> None:
+        self._pop(chat_id)
+
+
+def _with_event_id(event_id: int, frame: str) -> str:
+    return f"id: {event_id}\n{frame}"
+
+
+def _replay_gap_frame(last_event_id: int, oldest_event_id: int) -> str:
+    """
+    재연결한 클라이언트가 받지 못한 프레임이 버퍼에서 이미 제거되었을 때 보내는 이벤트. (id 없음)
+    이어 붙이면 답변이 손상되므로, 클라이언트는 받은 답변을 버리고 다시 요청해야 합니다.
+    """
+    logger.warning(f"⚠️ 재전송 버퍼에 없는 이벤트가 있어 이어받을 수 없습니다. (last_event_id: {last_event_id}, oldest: {oldest_event_id})")
+    return to_sse(StreamEvent(
+        type="error",
+        message="연결이 끊긴 동안의 응답을 이어받을 수 없습니다. 다시 요청해 주세요.",
+        content={"code": "replay_gap", "last_event_id": last_event_id, "oldest_event_id": oldest_event_id},
+    ))
+
+
+# =============================================================================
+# Stream Session
+# =============================================================================
+
+class StreamSession:
+    """
+    채팅 한 턴의 오케스트레이터 실행. 클라이언트 연결과 분리되어 실행되며,
+    여러 구독자(재연결 포함)가 같은 실행에 붙을 수 있습니다.
+
+    - 프레임은 replay backend 에만 저장하고, 세션은 구독자가 아직 받지 않은 프레임의 (id, 크기)만 추적합니다.
+    - 가장 느린 구독자가 아직 받지 않은 프레임이 capacity 개 또는 max_bytes 를 넘게 되면 생산을 멈춥니다 (backpressure).
+      backend 의 채팅별 제한이 capacity / max_bytes 이상이면, backend 는 모든 구독자가 받은 프레임만 버립니다.
+    - 구독자가 모두 떠나면 grace_seconds 동안 재연결을 기다렸다가 실행을 취소합니다.
+    """
+
+    def __init__(
+        self, chat_id: str, user_message: str, backend: ReplayBackend, capacity: int, max_bytes: int, grace_seconds: float
+    ):
+        self.chat_id = chat_id
+        self.user_message = user_message  # 재연결 요청이 같은 턴인지 확인하는 데 사용
+        self.done = False
+        self._backend = backend
+        self._capacity = capacity
+        self._max_bytes = max_bytes
+        self._grace_seconds = grace_seconds
+        self._unacked: Deque[Tuple[int, int]] = deque()  # 모든 구독자가 받지는 않은 프레임의 (id, 크기)
+        self._unacked_bytes = 0
+        self._first_id: Optional[int] = None
+        self._last_id = 0
+        self._changed = asyncio.Condition()
+        # 구독자별 마지막으로 받은 id. 첫 프레임 전에 구독하면 None (첫 프레임의 id 를 알 수 없으므로)
+        self._cursors: Dict[int, Optional[int]] = {}
+        self._next_token = 0
+        self._task: Optional[asyncio.Task] = None
+        self._grace: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_id
+
+    def start(self, source: AsyncGenerator[str, None]) -> asyncio.Task:
+        self._task = asyncio.create_task(self._run(source))
+        self._schedule_expiry()  # 아무도 구독하지 않으면 grace 후 취소
+        return self._task
+
+    async def _run(self, source: AsyncGenerator[str, None]):
+        try:
+            async for frame in source:
+                await self._publish(frame)
+        except Exception as e:
+            logger.error(f"❌ 스트림 세션 실행 중 오류가 발생했습니다 (chat_id: {self.chat_id}): {e}", exc_info=True)
+        finally:
+            # 취소된 경우에도 source 를 닫아 stream_agent 가 그래프 실행을 중단하도록 합니다.
+            await source.aclose()
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    def _release(self):
+        """모든 구독자가 받은 프레임을 추적 목록에서 뺍니다."""
+        if self._first_id is None:
+            return
+        delivered = min(self._cursors.values(), default=self._last_id)
+        while self._unacked and self._unacked[0][0] <= delivered:
+            _, size = self._unacked.popleft()
+            self._unacked_bytes -= size
+
+    def _has_room(self, size: int) -> bool:
+        self._release()
+        if not self._cursors or not self._unacked:
+            return True
+        return len(self._unacked) < self._capacity and self._unacked_bytes + size <= self._max_bytes
+
+    async def _publish(self, frame: str):
+        size = _frame_size(frame)
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._has_room(size))
+        event_id = await self._backend.append(self.chat_id, frame)
+        async with self._changed:
+            if self._first_id is None:
+                self._first_id = event_id
+                for token, cursor in self._cursors.items():
+                    if cursor is None:
+                        self._cursors[token] = event_id - 1
+            self._last_id = event_id
+            self._unacked.append((event_id, size))
+            self._unacked_bytes += size
+            self._release()
+            self._changed.notify_all()
+
+    def _schedule_expiry(self):
+        if self._grace is None and not self._cursors and not self.done:
+            self._grace = asyncio.get_running_loop().call_later(self._grace_seconds, self._expire)
+
+    def cancel(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    def _expire(self):
+        self._grace = None
+        if not self._cursors and self._task and not self._task.done():
+            logger.info(f"🛑 재연결이 없어 스트림 실행을 취소합니다. (chat_id: {self.chat_id})")
+            self._task.cancel()
+
+    async def subscribe(self, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        last_event_id 이후의 프레임부터 실행이 끝날 때까지 전달합니다.
+        last_event_id 가 이 턴의 첫 프레임보다 앞이면(이전 턴의 id) 이 턴의 처음부터 보냅니다.
+        받지 못한 프레임 일부가 backend 에서 이미 버려졌으면 replay_gap 오류 이벤트만 보내고 끝냅니다.
+        """
+        token = self._next_token
+        self._next_token += 1
+        if self._first_id is None:
+            self._cursors[token] = None
+        else:
+            self._cursors[token] = max(self._first_id - 1, last_event_id if last_event_id is not None else -1)
+        if self._grace is not None:
+            self._grace.cancel()
+            self._grace = None
+
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: self.done or self._cursors[token] is not None and self._last_id > self._cursors[token])
+                    cursor, last_id = self._cursors[token], self._last_id
+                    if cursor is None or last_id <= cursor:
+                        return
+
+                frames = [(i, f) for i, f in await self._backend.read_after(self.chat_id, cursor) if i <= last_id]
+                if not frames or frames[0][0] > cursor + 1:
+                    yield _replay_gap_frame(cursor, frames[0][0] if frames else last_id)
+                    return
+
+                async with self._changed:
+                    self._cursors[token] = frames[-1][0]
+                    self._changed.notify_all()
+                for event_id, frame in frames:
+                    yield _with_event_id(event_id, frame)
+        finally:
+            self._cursors.pop(token, None)
+            self._schedule_expiry()
+            async with self._changed:
+                self._changed.notify_all()
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+
+class StreamRegistry:
+    """
+    채팅 id 별로 스트림 세션을 관리합니다.
+    실행이 끝난 세션도 재연결 대기 시간(grace_seconds) 동안 남겨 두어, 재연결 요청이 같은 턴인지 확인할 수 있게 합니다.
+    """
+
+    def __init__(self, backend: ReplayBackend, capacity: int, max_bytes: int, grace_seconds: float):
+        self.backend = backend
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        self._sessions: Dict[str, StreamSession] = {}
+        self._expiring: Set[asyncio.Task] = set()
+
+    def start(self, chat_id: str, user_message: str, source: AsyncGenerator[str, None]) -> StreamSession:
+        """
+        새 턴의 세션을 등록하고 실행합니다.
+        같은 채팅에서 아직 실행 중인 이전 턴은 취소합니다. (추적되지 않은 채 실행을 계속하거나 응답을 저장하지 않도록)
+        """
+        previous = self._sessions.get(chat_id)
+        if previous is not None and not previous.done:
+            logger.info(f"🛑 새 턴이 시작되어 이전 스트림 실행을 취소합니다. (chat_id: {chat_id})")
+            previous.cancel()
+
+        session = StreamSession(chat_id, user_message, self.backend, self.capacity, self.max_bytes, self.grace_seconds)
+        self._sessions[chat_id] = session
+        session.start(source).add_done_callback(lambda _: self._finish(session))
+        return session
+
+    def active_count(self) -> int:
+        """실행 중인 스트림 세션 수."""
+        return sum(1 for session in self._sessions.values() if not session.done)
+
+    def _finish(self, session: StreamSession):
+        # 재연결 대기 시간이 지나면 세션과 재전송 버퍼를 지웁니다. 그 사이 새 턴이 시작되었으면 새 턴의 것은 남겨 둡니다.
+        asyncio.get_running_loop().call_later(self.grace_seconds, self._expire_session, session)
+
+    def _expire_session(self, session: StreamSession):
+        if self._sessions.get(session.chat_id) is session:
+            del self._sessions[session.chat_id]
+        task = asyncio.create_task(self.backend.expire(session.chat_id, session.last_event_id))
+        self._expiring.add(task)
+        task.add_done_callback(self._expiring.discard)
+
+    async def resume(self, chat_id: str, last_event_id: int, user_message: str = "") -> Optional[AsyncIterator[str]]:
+        """
+        Last-Event-ID 로 재연결한 클라이언트에 이어서 보낼 스트림을 반환합니다.
+        - 실행 중이거나 재연결 대기 시간 안에 끝난 세션의 last_event_id 이후 프레임을 보냅니다.
+        - 받지 못한 프레임이 이미 버려졌으면 replay_gap 오류 이벤트만 보냅니다.
+        - 세션이 없거나, 요청의 user_message 가 그 세션의 메시지와 다르거나(새 턴),
+          끝난 세션의 프레임을 이미 모두 받았으면 None (호출 측에서 새로 실행).
+        """
+        session = self._sessions.get(chat_id)
+        if session is None:
+            return None
+        if user_message and user_message != session.user_message:
+            logger.info(f"🆕 재연결 요청의 메시지가 진행 중인 턴과 달라 새로 실행합니다. (chat_id: {chat_id}, last_event_id: {last_event_id})")
+            return None
+        if session.done and last_event_id >= session.last_event_id:
+            return None
+
+        logger.info(f"🔁 스트림에 재연결합니다. (chat_id: {chat_id}, last_event_id: {last_event_id}, done: {session.done})")
+        return session.subscribe(last_event_id)
+
+    async def discard(self, chat_id: str) -> None:
+        """실행 중인 세션을 취소하고(응답이 저장되지 않습니다) 재전송 버퍼를 비웁니다."""
+        session = self._sessions.pop(chat_id, None)
+        if session is not None:
+            session.cancel()
+        await self.backend.discard(chat_id)
+
+
+stream_registry = StreamRegistry(
+    backend=InMemoryReplayBackend(
+        buffer_size=settings.STREAM_REPLAY_BUFFER_SIZE,
+        max_chats=settings.STREAM_REPLAY_MAX_CHATS,
+        max_bytes_per_chat=settings.STREAM_REPLAY_MAX_BYTES_PER_CHAT,
+        max_total_bytes=settings.STREAM_REPLAY_MAX_TOTAL_BYTES,
+    ),
+    capacity=settings.STREAM_REPLAY_BUFFER_SIZE,
+    max_bytes=settings.STREAM_REPLAY_MAX_BYTES_PER_CHAT,
+    grace_seconds=settings.STREAM_RESUME_GRACE_SECONDS,
+)
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.database.chat_history import aget_chat_history, aget_chat_summary
+from app.database.promotion_slots import aget_or_create_state
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TurnContext:
+    """한 턴을 시작하는 데 필요한 최근 대화 기록, 대화 요약, 프로모션 상태."""
+    chat_id: str
+    history: List[Dict[str, Any]]
+    state: Dict[str, Any]
+    summary: str = ""
+    summary_until: Optional[datetime] = None  # 요약에 반영된 마지막 턴의 시각. 이후 메시지만 원문으로 전달합니다.
+    chat_found: bool = True  # 채팅 문서가 없거나 삭제 표시되었으면 False (include_summary=True 일 때만 확인)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    def server_timing(self) -> str:
+        """응답의 Server-Timing 헤더 값 (브라우저/프록시에서 첫 바이트까지의 시간을 나눠 보기 위함)."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.timings_ms.items())
+
+
+async def _timed(name: str, coro, timings_ms: Dict[str, float]):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings_ms[name] = round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _no_summary():
+    return None
+
+
+async def aload_turn_context(
+    chat_id: str,
+    history_limit: int = settings.CHAT_CONTEXT_RECENT_MESSAGES,
+    include_summary: bool = True,
+) -> TurnContext:
+    """
+    최근 대화 기록(텍스트 필드만), 대화 요약, 프로모션 상태를 동시에 불러옵니다.
+    이전 턴은 요약으로 전달하므로 원문은 최근 history_limit 개만 읽습니다. (LLM 에는 요약 이후의 메시지만 전달)
+    요약을 쓰지 않는 호출(createPlan 등)은 include_summary=False 로 요약 조회를 생략합니다.
+    상태는 state_cache 를 먼저 확인하므로, 같은 채팅의 연속된 턴에서는 DB 조회 없이 반환됩니다.
+    """
+    timings_ms: Dict[str, float] = {}
+    start = time.perf_counter()
+
+    history, summary, state = await asyncio.gather(
+        _timed("history", aget_chat_history(chat_id=chat_id, limit=history_limit), timings_ms),
+        _timed("summary", aget_chat_summary(chat_id), timings_ms) if include_summary else _no_summary(),
+        _timed("state", aget_or_create_state(chat_id=chat_id), timings_ms),
+    )
+
+    timings_ms["turn_context"] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"⏱️ 턴 컨텍스트 로드 완료 (chat_id: {chat_id}, {timings_ms})")
+    return TurnContext(
+        chat_id=chat_id,
+        history=history,
+        state=state,
+        summary=summary["summary"] if summary else "",
+        summary_until=summary["summary_until"] if summary else None,
+        chat_found=summary is not None or not include_summary,
+        timings_ms=timings_ms,
+    )
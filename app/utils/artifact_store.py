@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# 메시지 문서에서 artifact store 로 옮길 수 있는 필드
+ARTIFACT_FIELDS = ("graph_data", "plan_data")
+
+
+class ArtifactStore(ABC):
+    """
+    그래프/기획서 같은 큰 payload 저장소 인터페이스. 키는 내용의 sha256 (content addressing) 입니다.
+    """
+
+    @abstractmethod
+    def put(self, artifact_id: str, data: bytes, content_type: str) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, artifact_id: str) -> Optional[Tuple[bytes, str]]:
+        """(내용, 저장할 때의 content_type). 없으면 None."""
+        ...
+
+    @abstractmethod
+    def exists(self, artifact_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, artifact_id: str) -> None:
+        ...
+
+
+class LocalArtifactStore(ArtifactStore):
+    """로컬 디스크 저장소 (개발/테스트용)."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def _path(self, artifact_id: str) -> str:
+        return os.path.join(self.root_dir, artifact_id[:2], artifact_id)
+
+    def put(self, artifact_id: str, data: bytes, content_type: str) -> None:
+        path = self._path(artifact_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # content_type 을 먼저 기록해, 내용 파일이 보이면 content_type 도 항상 있도록 합니다.
+        for target, content in ((f"{path}.content-type", content_type.encode("utf-8")), (path, data)):
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, target)
+
+    def get(self, artifact_id: str) -> Optional[Tuple[bytes, str]]:
+        path = self._path(artifact_id)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            with open(f"{path}.content-type", "rb") as f:
+                content_type = f.read().decode("utf-8")
+        except FileNotFoundError:
+            return None
+        return data, content_type
+
+    def exists(self, artifact_id: str) -> bool:
+        return os.path.exists(self._path(artifact_id))
+
+    def delete(self, artifact_id: str) -> None:
+        path = self._path(artifact_id)
+        for target in (path, f"{path}.content-type"):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+
+
+class BlobArtifactStore(ArtifactStore):
+    """Azure Blob Storage 저장소. 컨테이너가 없으면 생성합니다."""
+
+    def __init__(self, connection_string: str, container_name: str):
+        from azure.core.exceptions import ResourceExistsError
+        from azure.storage.blob import BlobServiceClient
+
+        self._container = BlobServiceClient.from_connection_string(connection_string).get_container_client(container_name)
+        try:
+            self._container.create_container()
+            logger.info(f"✅ artifact 컨테이너를 생성했습니다: {container_name}")
+        except ResourceExistsError:
+            pass
+
+    def put(self, artifact_id: str, data: bytes, content_type: str) -> None:
+        from azure.storage.blob import ContentSettings
+
+        self._container.get_blob_client(artifact_id).upload_blob(
+            data, overwrite=True, content_settings=ContentSettings(content_type=content_type)
+        )
+
+    def get(self, artifact_id: str) -> Optional[Tuple[bytes, str]]:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            downloader = self._container.get_blob_client(artifact_id).download_blob()
+        except ResourceNotFoundError:
+            return None
+        content_type = downloader.properties.content_settings.content_type or "application/octet-stream"
+        return downloader.readall(), content_type
+
+    def exists(self, artifact_id: str) -> bool:
+        return self._container.get_blob_client(artifact_id).exists()
+
+    def delete(self, artifact_id: str) -> None:
+        self._container.get_blob_client(artifact_id).delete_blob(delete_snapshots="include")
+
+
+@lru_cache(maxsize=1)
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """
+    설정된 artifact store. ARTIFACT_STORE_BACKEND 를 설정했을 때만 사용하며,
+    비어 있거나 "inline" 이거나 저장소를 만들 수 없으면 None (payload 를 메시지 문서에 그대로 저장) 입니다.
+    """
+    backend = settings.ARTIFACT_STORE_BACKEND or "inline"
+    try:
+        if backend == "blob":
+            return BlobArtifactStore(settings.AZURE_STORAGE_CONNECTION_STRING, settings.ARTIFACT_BLOB_CONTAINER_NAME)
+        if backend == "local":
+            return LocalArtifactStore(settings.ARTIFACT_LOCAL_DIR)
+    except Exception as e:
+        logger.error(f"❌ artifact store({backend})를 만들 수 없어 payload 를 메시지에 그대로 저장합니다: {e}")
+    return None
+
+
+def _serialize(payload: Any) -> Tuple[bytes, str]:
+    # 그래프는 fig.to_json() 결과(JSON 문자열)로 들어오므로 그대로 저장합니다.
+    if isinstance(payload, str):
+        return payload.encode("utf-8"), "application/json" if payload[:1] in "{[" else "text/plain; charset=utf-8"
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8"), "application/json"
+
+
+def _put(store: ArtifactStore, data: bytes, content_type: str) -> Dict[str, Any]:
+    artifact_id = hashlib.sha256(data).hexdigest()
+    if not store.exists(artifact_id):
+        store.put(artifact_id, data, content_type)
+    return {"artifact_id": artifact_id, "content_type": content_type, "size": len(data)}
+
+
+def offload_message_artifacts(message_docs: List[Dict[str, Any]], store: Optional[ArtifactStore] = None) -> None:
+    """
+    메시지 문서의 큰 graph_data/plan_data 를 artifact store 로 옮기고 `<필드>_ref` 참조로 바꿉니다. (문서를 직접 수정)
+    ARTIFACT_INLINE_MAX_BYTES 이하의 작은 값과, 저장에 실패한 값은 문서에 그대로 둡니다.
+    """
+    store = store or get_artifact_store()
+    if store is None:
+        return
+
+    for doc in message_docs:
+        for field in ARTIFACT_FIELDS:
+            payload = doc.get(field)
+            if payload is None:
+                continue
+            data, content_type = _serialize(payload)
+            if len(data) <= settings.ARTIFACT_INLINE_MAX_BYTES:
+                continue
+            try:
+                doc[f"{field}_ref"] = _put(store, data, content_type)
+                doc[field] = None
+            except Exception as e:
+                logger.warning(f"⚠️ artifact 저장 실패, 메시지에 그대로 저장합니다 (chat_id: {doc.get('chat_id')}): {e}")
@@ -0,0 +1,122 @@
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# (kind, value) — kind 은 "text" 또는 "marker"
+#   - ("text", "일반 텍스트 구간")
+#   - ("marker", "table_start")
+ScanEvent = Tuple[str, str]
+
+
+class MarkerScanner:
+    """
+    스트리밍 텍스트에서 여러 개의 마커 문자열을 찾는 Aho-Corasick 상태 기계.
+
+    - feed()에 모델 청크를 통째로 넘기면 일반 텍스트 구간과 마커 이벤트를 순서대로 반환합니다.
+    - 청크 경계에 걸친 마커도 찾아내며, 마커의 접두사가 될 수 있는 최소한의 꼬리만 보류합니다.
+    - 스트림이 끝나면 finish()로 보류된 꼬리를 텍스트로 돌려받습니다.
+
+    Example:
+        scanner = MarkerScanner({"[TABLE_START]": "table_start", "[TABLE_END]": "table_end"})
+        scanner.feed("표 [TABLE_")   # [("text", "표 ")]
+        scanner.feed("START]| a |")  # [("marker", "table_start"), ("text", "| a |")]
+    """
+
+    def __init__(self, markers: Mapping[str, str]):
+        if not markers or any(not m for m in markers):
+            raise ValueError("markers에는 비어 있지 않은 마커 문자열이 1개 이상 필요합니다.")
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        # 상태별로 끝나는 마커 (자기 자신 또는 실패 링크를 따라 만나는 가장 긴 마커)
+        self._out: List[Optional[Tuple[int, str]]] = [None]
+
+        for marker, name in markers.items():
+            node = 0
+            for ch in marker:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[node] + 1)
+                    self._out.append(None)
+                    self._goto[node][ch] = nxt
+                node = nxt
+            self._out[node] = (len(marker), name)
+
+        # BFS로 실패 링크 계산
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                if self._out[nxt] is None:
+                    self._out[nxt] = self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+        # 루트 상태에서는 마커 첫 글자가 나올 때까지 정규식으로 건너뜁니다.
+        first_chars = "".join(sorted(set(self._goto[0])))
+        self._first_re = re.compile("[" + re.escape(first_chars) + "]")
+
+        self._state = 0
+        self._pending = ""
+
+    @property
+    def pending(self) -> str:
+        """마커의 일부일 수 있어 아직 내보내지 않은 꼬리 텍스트."""
+        return self._pending
+
+    def _step(self, state: int, ch: str) -> int:
+        goto, fail = self._goto, self._fail
+        while state and ch not in goto[state]:
+            state = fail[state]
+        return goto[state].get(ch, 0)
+
+    def feed(self, chunk: str) -> List[ScanEvent]:
+        events: List[ScanEvent] = []
+        if not chunk:
+            return events
+
+        buf = self._pending + chunk
+        n = len(buf)
+        emitted = 0
+        state = self._state
+        i = len(self._pending)
+
+        while i < n:
+            if state == 0:
+                m = self._first_re.search(buf, i)
+                if m is None:
+                    i = n
+                    break
+                i = m.start()
+
+            state = self._step(state, buf[i])
+            out = self._out[state]
+            if out is not None:
+                length, name = out
+                start = i + 1 - length
+                if start > emitted:
+                    events.append(("text", buf[emitted:start]))
+                events.append(("marker", name))
+                emitted = i + 1
+                state = 0
+            i += 1
+
+        hold = self._depth[state]
+        cut = n - hold
+        if cut > emitted:
+            events.append(("text", buf[emitted:cut]))
+        self._pending = buf[cut:] if hold else ""
+        self._state = state
+        return events
+
+    def finish(self) -> List[ScanEvent]:
+        """보류 중인 꼬리를 텍스트로 내보내고 상태를 초기화합니다."""
+        events: List[ScanEvent] = [("text", self._pending)] if self._pending else []
+        self._pending = ""
+        self._state = 0
+        return events
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, List, Optional, TypeVar
+
+from app.schema.stream import StreamEvent
+
+T = TypeVar("T")
+
+_END = object()
+
+
+def to_sse(event: StreamEvent) -> str:
+    return f"data: {json.dumps(event.to_payload(), ensure_ascii=False)}\n\n"
+
+
+async def encode_sse(events: AsyncIterator[StreamEvent]) -> AsyncIterator[str]:
+    """StreamEvent 스트림을 SSE 프레임 문자열로 변환합니다. (응답 직전 한 번만 직렬화)"""
+    async with aclosing(events):
+        async for event in events:
+            yield to_sse(event)
+
+
+async def with_deadline(source: AsyncIterator[T], timeout: Callable[[], Optional[float]]) -> AsyncIterator[Optional[T]]:
+    """
+    source 의 항목을 그대로 내보내되, 다음 항목을 기다리는 동안 timeout() 초가 지나면 None 을 내보냅니다.
+    timeout() 이 None 이면 다음 항목이 올 때까지 기다립니다.
+
+    source 는 별도 태스크 하나에서 끝까지 순회하므로(컨텍스트 변수 유지), 호출 측은 source 를 닫기 전에
+    이 제너레이터를 먼저 닫아야 합니다.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def pump():
+        try:
+            async for item in source:
+                await queue.put((item, None))
+            await queue.put((_END, None))
+        except Exception as e:
+            await queue.put((_END, e))
+
+    producer = asyncio.create_task(pump())
+    getter: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=timeout())
+            if not done:
+                yield None
+                continue
+            item, error = getter.result()
+            getter = None
+            if error is not None:
+                raise error
+            if item is _END:
+                return
+            yield item
+    finally:
+        for task in (getter, producer):
+            if task is not None:
+                task.cancel()
+        await asyncio.wait({producer})
+
+
+class ChunkCoalescer:
+    """
+    문자 단위로 들어오는 응답 텍스트를 모아 SSE 프레임 단위로 내보냅니다.
+
+    - 누적 길이가 max_chars 이상이거나, 마지막 flush 이후 interval_ms가 지나면 flush 합니다.
+    - max_chars <= 1 이면 기존처럼 문자 하나당 프레임 하나를 만듭니다.
+    - push() 가 없는 동안에도 기한을 넘기지 않도록, 호출 측은 timeout() 을 다음 이벤트 대기 시간으로 쓰고
+      (with_deadline) 시간이 지나면 flush() 합니다.
+    - 텍스트가 아닌 이벤트(테이블 마커, 노드 상태 등)를 보내기 전과 스트림 종료 시에도 flush()를 호출해야 합니다.
+    """
+
+    def __init__(self, max_chars: int = 256, interval_ms: int = 20):
+        self.max_chars = max(1, max_chars)
+        self.interval = max(0, interval_ms) / 1000
+        self._parts: List[str] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, text: str) -> Optional[str]:
+        """텍스트를 누적하고, flush 조건을 만족하면 내보낼 문자열을 반환합니다."""
+        if not text:
+            return None
+        self._parts.append(text)
+        self._size += len(text)
+
+        if self._size >= self.max_chars or time.monotonic() - self._last_flush >= self.interval:
+            return self.flush()
+        return None
+
+    def timeout(self) -> Optional[float]:
+        """누적된 텍스트의 flush 기한까지 남은 초를 반환합니다. 비어 있으면 None."""
+        if not self._parts:
+            return None
+        return max(0.0, self._last_flush + self.interval - time.monotonic())
+
+    def flush(self) -> Optional[str]:
+        """누적된 텍스트를 모두 반환합니다. 비어 있으면 None."""
+        self._last_flush = time.monotonic()
+        if not self._parts:
+            return None
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        return text
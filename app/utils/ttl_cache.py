@@ -0,0 +1,140 @@
+import copy
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    TTLCache 저장소 인터페이스.
+    여러 replica 가 같은 캐시를 보려면 Redis 등 공유 저장소로 이 인터페이스를 구현합니다.
+    get() 은 값이 없거나 만료되었으면 None 을 반환합니다.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemoryLRUBackend(CacheBackend):
+    """프로세스 내 LRU + TTL 저장소. 워커 스레드(그래프 노드)에서도 호출되므로 lock 으로 보호합니다."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+        self._items: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                self.expirations += 1
+                return None
+            self._items.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl_seconds, copy.deepcopy(value))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._items), "max_size": self.max_size, "evictions": self.evictions, "expirations": self.expirations}
+
+
+class TTLCache:
+    """
+    key -> value 캐시. 저장소(backend)를 바꿔 끼울 수 있고 hit/miss 통계를 집계합니다.
+
+    Example:
+        cache = TTLCache("promotion_state", InMemoryLRUBackend(max_size=1000), ttl_seconds=60)
+        state = cache.get_or_load(chat_id, lambda: load_state(chat_id))
+    """
+
+    def __init__(self, name: str, backend: CacheBackend, ttl_seconds: float):
+        self.name = name
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        _caches[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if value is None:
+            return
+        self.backend.set(key, value, self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+
+    def invalidate(self, key: Hashable) -> None:
+        self.backend.delete(key)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+            **self.backend.stats(),
+        }
+
+
+# 이름 -> 캐시 (통계 조회용)
+_caches: Dict[str, TTLCache] = {}
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _caches.items()}
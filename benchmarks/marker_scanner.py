@@ -0,0 +1,96 @@
+"""
+stream_agent 테이블 마커 감지 마이크로벤치마크.
+
+기존 방식(문자마다 deque 윈도우 + "".join 비교)과 MarkerScanner(청크 단위 Aho-Corasick)를
+같은 모델 청크 시퀀스에 대해 비교합니다.
+
+실행:
+    python -m benchmarks.marker_scanner
+"""
+import random
+import time
+from collections import deque
+from typing import List
+
+from app.utils.marker_scanner import MarkerScanner
+
+TOKEN_START = "[TABLE_START]"
+TOKEN_END = "[TABLE_END]"
+MARKERS = {TOKEN_START: "table_start", TOKEN_END: "table_end"}
+
+
+def build_chunks(n_chars: int, chunk_size: int = 40, seed: int = 7) -> List[str]:
+    """한글 본문 + 마크다운 표가 섞인 응답을 만들어 모델 청크 크기로 자릅니다."""
+    rng = random.Random(seed)
+    words = ["프로모션", "매출", "브랜드", "성장률", "고객", "[참고]", "상위", "10개", "분석", "결과입니다."]
+    table = (
+        f"\n{TOKEN_START}\n| 브랜드 | 매출 |\n| --- | --- |\n"
+        + "".join(f"| 브랜드{i} | {i * 1000:,} |\n" for i in range(10))
+        + f"{TOKEN_END}\n"
+    )
+    parts, size = [], 0
+    while size < n_chars:
+        part = table if rng.random() < 0.05 else rng.choice(words) + " "
+        parts.append(part)
+        size += len(part)
+    text = "".join(parts)
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def legacy_deque(chunks: List[str]) -> int:
+    """기존 stream_agent 의 문자 단위 deque 윈도우 방식 (이벤트 개수 반환)."""
+    is_in_table = False
+    outside = deque(maxlen=len(TOKEN_START))
+    inside = deque(maxlen=len(TOKEN_END))
+    events = 0
+    for chunk in chunks:
+        for c in chunk:
+            if is_in_table:
+                buffer, token = inside, TOKEN_END
+            else:
+                buffer, token = outside, TOKEN_START
+            if len(buffer) < buffer.maxlen:
+                buffer.append(c)
+                continue
+            buffer.popleft()
+            events += 1
+            buffer.append(c)
+            if "".join(buffer) == token:
+                is_in_table = not is_in_table
+                events += 1
+                buffer.clear()
+    return events
+
+
+def marker_scanner(chunks: List[str]) -> int:
+    scanner = MarkerScanner(MARKERS)
+    events = 0
+    for chunk in chunks:
+        events += len(scanner.feed(chunk))
+    return events + len(scanner.finish())
+
+
+def bench(fn, chunks: List[str], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'chars':>8} {'chunk':>6} {'deque (ms)':>12} {'scanner (ms)':>13} {'speedup':>8}")
+    for n_chars in (2_000, 20_000, 200_000):
+        for chunk_size in (1, 40, 400):
+            chunks = build_chunks(n_chars, chunk_size)
+            legacy = bench(legacy_deque, chunks)
+            scanner = bench(marker_scanner, chunks)
+            print(
+                f"{n_chars:>8} {chunk_size:>6} {legacy * 1000:>12.2f} {scanner * 1000:>13.2f} "
+                f"{legacy / scanner:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
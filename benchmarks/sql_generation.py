@@ -0,0 +1,153 @@
+"""
+text-to-SQL 생성 방식 벤치마크: fast(단일 LLM 호출) vs crew(2단계 CrewAI 파이프라인).
+
+고정 질문 세트마다 SQL 을 생성해 실행하고, 기준 SQL 의 결과와 비교합니다.
+- latency: SQL 생성 시간 (실행 시간 제외), p50 / p95 / 평균
+- accuracy: 결과 행 집합이 기준 SQL 결과와 같은 비율 (열 이름/행 순서 무시)
+- exec_error: 생성된 SQL 이 실행에 실패한 비율
+- invalid: fast 모드에서 validate_sql 에 걸린 비율 (실서비스에서는 crew 로 넘어가는 경우)
+
+SQL/결과 캐시를 거치지 않고 생성 함수를 직접 호출합니다. settings.CONN_STR 의 DB 와 settings.SCHEMA_INFO 를 사용합니다.
+
+실행:
+    python -m benchmarks.sql_generation
+    python -m benchmarks.sql_generation --modes fast --repeat 3
+"""
+import argparse
+import statistics
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.agents.text_to_sql.crew import crewAI_sql_generator
+from app.agents.text_to_sql.fast import fast_sql_generator, validate_sql
+from app.core.config import settings
+from app.database.sql_engines import dispose_engines, get_engine
+
+# (질문, 기준 SQL). 날짜는 고정해 실행 시점과 관계없이 같은 결과가 나오도록 합니다.
+QUESTIONS: List[Tuple[str, str]] = [
+    (
+        "채널 유형별 채널 수를 channel_type, channel_count 컬럼으로 조회해 주세요.",
+        "SELECT channel_type, COUNT(*) FROM channels GROUP BY channel_type",
+    ),
+    (
+        "2024-06-01부터 2024-06-30까지 주문 건수와 총 주문 금액을 조회해 주세요.",
+        "SELECT COUNT(*), SUM(total_amount) FROM orders "
+        "WHERE order_datetime >= '2024-06-01' AND order_datetime < '2024-07-01'",
+    ),
+    (
+        "2024-06-01부터 2024-06-30까지 매출 상위 10개 브랜드를 brand, revenue 컬럼으로 조회해 주세요. 매출은 quantity × unit_price 합계입니다.",
+        "SELECT p.brand, SUM(oi.quantity * oi.unit_price) AS revenue FROM order_items oi "
+        "JOIN orders o ON o.order_id = oi.order_id JOIN products p ON p.product_id = oi.product_id "
+        "WHERE o.order_datetime >= '2024-06-01' AND o.order_datetime < '2024-07-01' "
+        "GROUP BY p.brand ORDER BY revenue DESC LIMIT 10",
+    ),
+    (
+        "2024년 6월 채널별 광고비 합계를 channel_name, spend 컬럼으로 조회해 주세요.",
+        "SELECT c.channel_name, SUM(a.spend) FROM ad_daily a JOIN channels c ON c.channel_id = a.channel_id "
+        "WHERE a.date >= '2024-06-01' AND a.date < '2024-07-01' GROUP BY c.channel_name",
+    ),
+    (
+        "연령대별 회원 수를 age_group, user_count 컬럼으로 조회해 주세요.",
+        "SELECT age_group, COUNT(*) FROM users GROUP BY age_group",
+    ),
+    (
+        "2024-06-01부터 2024-06-30까지 첫 구매 주문 수를 조회해 주세요.",
+        "SELECT COUNT(*) FROM orders WHERE is_first_purchase "
+        "AND order_datetime >= '2024-06-01' AND order_datetime < '2024-07-01'",
+    ),
+    (
+        "2024-06-01부터 2024-06-30까지 디바이스별 세션 수를 device, sessions 컬럼으로 조회해 주세요.",
+        "SELECT device, COUNT(*) FROM web_sessions "
+        "WHERE session_date >= '2024-06-01' AND session_date < '2024-07-01' GROUP BY device",
+    ),
+    (
+        "2024-06-01부터 2024-06-30까지 클릭률(clicks/impressions)이 가장 높은 캠페인 5개를 campaign_name, ctr 컬럼으로 조회해 주세요.",
+        "SELECT c.campaign_name, SUM(a.clicks)::numeric / NULLIF(SUM(a.impressions), 0) AS ctr FROM ad_daily a "
+        "JOIN campaigns c ON c.campaign_id = a.campaign_id "
+        "WHERE a.date >= '2024-06-01' AND a.date < '2024-07-01' "
+        "GROUP BY c.campaign_id, c.campaign_name ORDER BY ctr DESC NULLS LAST LIMIT 5",
+    ),
+]
+
+GENERATORS: Dict[str, Callable[[str, str], str]] = {
+    "fast": lambda question, schema_info: fast_sql_generator(message=question, schema_info=schema_info),
+    "crew": lambda question, schema_info: crewAI_sql_generator(message=question, schema_info=schema_info),
+}
+
+
+def _normalize_value(value):
+    if isinstance(value, (float, Decimal)):
+        return round(float(value), 4)
+    return str(value) if value is not None else None
+
+
+def run_query(sql: str) -> List[tuple]:
+    with get_engine(settings.CONN_STR).connect() as conn:
+        rows = conn.execute(text(sql)).fetchall()
+    return sorted((tuple(_normalize_value(v) for v in row) for row in rows), key=repr)
+
+
+def evaluate(mode: str, repeat: int) -> Dict[str, float]:
+    generate = GENERATORS[mode]
+    latencies: List[float] = []
+    correct = exec_errors = invalid = total = 0
+
+    for question, reference_sql in QUESTIONS:
+        expected = run_query(reference_sql)
+        for _ in range(repeat):
+            total += 1
+            start = time.perf_counter()
+            try:
+                sql: Optional[str] = generate(question, settings.SCHEMA_INFO)
+            except Exception as e:
+                print(f"  [{mode}] 생성 실패: {question[:40]}... ({e})")
+                exec_errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+            if mode == "fast" and validate_sql(sql):
+                invalid += 1
+            try:
+                ok = run_query(sql) == expected
+            except Exception as e:
+                print(f"  [{mode}] 실행 실패: {question[:40]}... ({str(e).splitlines()[0]})")
+                exec_errors += 1
+                continue
+            correct += ok
+            if not ok:
+                print(f"  [{mode}] 결과 불일치: {question[:40]}...")
+
+    latencies.sort()
+    return {
+        "n": total,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else float("nan"),
+        "mean": statistics.fmean(latencies) if latencies else float("nan"),
+        "accuracy": correct / total if total else 0.0,
+        "exec_error": exec_errors / total if total else 0.0,
+        "invalid": invalid / total if total else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="text-to-SQL 생성 방식 벤치마크")
+    parser.add_argument("--modes", nargs="+", choices=sorted(GENERATORS), default=["fast", "crew"])
+    parser.add_argument("--repeat", type=int, default=1, help="질문마다 생성 반복 횟수")
+    args = parser.parse_args(argv)
+
+    results = {mode: evaluate(mode, args.repeat) for mode in args.modes}
+    dispose_engines()
+
+    print(f"\n{'mode':>6} {'n':>4} {'p50 (s)':>8} {'p95 (s)':>8} {'mean (s)':>9} {'accuracy':>9} {'exec_err':>9} {'invalid':>8}")
+    for mode, r in results.items():
+        print(
+            f"{mode:>6} {r['n']:>4} {r['p50']:>8.2f} {r['p95']:>8.2f} {r['mean']:>9.2f} "
+            f"{r['accuracy']:>9.1%} {r['exec_error']:>9.1%} {r['invalid']:>8.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()